@@ -19,4 +19,10 @@ The starting point is :py:class:`b4msa.textmodel.TextModel`
 """
 __version__ = "2.2.4"
 
-from b4msa.textmodel import TextModel
+
+def __getattr__(name):
+    # TextModel is imported on first use, so `import b4msa` does not load microtc
+    if name == 'TextModel':
+        from b4msa.textmodel import TextModel
+        return TextModel
+    raise AttributeError("module 'b4msa' has no attribute '{0}'".format(name))
@@ -12,15 +12,18 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from sklearn.svm import LinearSVC
 # from b4msa.textmodel import TextModel
+from collections import Counter as DocCounter
+import shutil
+import tempfile
 import numpy as np
-from microtc.utils import read_data_labels, read_data, tweet_iterator
-from sklearn import preprocessing
-from sklearn.model_selection import StratifiedKFold
+from microtc.utils import read_data_labels, tweet_iterator
 from b4msa.textmodel import TextModel
-from multiprocessing import Pool
-from scipy.sparse import csr_matrix
+from b4msa.corpus import SharedCorpus
+from b4msa.utils import chunk_iterator
+from b4msa.weighting import weight_array, HashingTFIDF
+from microtc.weighting import TF, Entropy, KLASS
+from scipy.sparse import csr_matrix, issparse, vstack
 
 
 class SVC(object):
@@ -28,6 +31,8 @@ class SVC(object):
 
     :param model: TextModel
     :type model: class
+    :param dtype: Type of the values of the sparse matrices, e.g., np.float32 halves their memory
+    :type dtype: type
 
     Usage:
 
@@ -40,9 +45,24 @@ class SVC(object):
     >>> svc.predict_text('hola')
     0
     """
-    def __init__(self, model, **kwargs):
+    def __init__(self, model, dtype=np.float64, **kwargs):
+        from sklearn.svm import LinearSVC
         self.svc = LinearSVC(**kwargs)
         self.model = model
+        self.dtype = dtype
+
+    @property
+    def dtype(self):
+        """Type of the values of the matrices produced by :py:func:`tonp`"""
+        try:
+            return self._dtype
+        except AttributeError:
+            self._dtype = np.float64
+        return self._dtype
+
+    @dtype.setter
+    def dtype(self, value):
+        self._dtype = value
 
     @property
     def num_terms(self):
@@ -58,38 +78,59 @@ class SVC(object):
         return None
 
     def tonp(self, X):
-        """Sparse representation to sparce matrix
+        """Sparse representation to sparce matrix; the pairs with a value
+        that is not finite or a column outside the dimension are discarded
 
         :param X: Sparse representation of matrix
-        :type X: list
+        :type X: list or csr_matrix
         :rtype: csr_matrix
+
+        >>> import numpy as np
+        >>> from b4msa.classifier import SVC
+        >>> svc = SVC(None, dtype=np.float32)
+        >>> svc.tonp([[(0, 0.5), (2, 1.0)], [(1, np.nan)]]).toarray()
+        array([[0.5, 0. , 1. ],
+               [0. , 0. , 0. ]], dtype=float32)
         """
 
-        data = []
-        row = []
-        col = []
-        for r, x in enumerate(X):
-            cc = [_[0] for _ in x if np.isfinite(_[1]) and (self.num_terms is None or _[0] < self.num_terms)]
-            col += cc
-            data += [_[1] for _ in x if np.isfinite(_[1]) and (self.num_terms is None or _[0] < self.num_terms)]
-            _ = [r] * len(cc)
-            row += _
+        dtype = self.dtype
+        if issparse(X):
+            X = X.tocsr()
+            if self.num_terms is None:
+                self._num_terms = X.shape[1]
+            elif X.shape[1] > self.num_terms:
+                X = X[:, :self.num_terms]
+            elif X.shape[1] < self.num_terms:
+                X = csr_matrix((X.data, X.indices, X.indptr),
+                               shape=(X.shape[0], self.num_terms))
+            if X.dtype != dtype:
+                X = X.astype(dtype)
+            return X
+        nrows = len(X)
+        lengths = np.fromiter((len(x) for x in X), dtype=np.int64, count=nrows)
+        size = int(lengths.sum())
+        col = np.fromiter((c for x in X for c, _ in x), dtype=np.int64, count=size)
+        data = np.fromiter((v for x in X for _, v in x), dtype=np.float64, count=size)
+        row = np.repeat(np.arange(nrows, dtype=np.int64), lengths)
+        mask = np.isfinite(data)
+        if self.num_terms is not None:
+            mask &= col < self.num_terms
+        data, row, col = data[mask].astype(dtype, copy=False), row[mask], col[mask]
         if self.num_terms is None:
-            _ = csr_matrix((data, (row, col)))
-            self._num_terms = _.shape[1]
-            return _
-        return csr_matrix((data, (row, col)), shape=(len(X), self.num_terms))
+            self._num_terms = int(col.max()) + 1 if col.shape[0] else 0
+        return csr_matrix((data, (row, col)), shape=(nrows, self.num_terms))
 
     def fit(self, X, y):
         """Train the classifier
 
         :param X: inputs - independent variables
-        :type X: lst
+        :type X: lst or csr_matrix, e.g., :py:func:`b4msa.textmodel.TextModel.transform`
         :param y: output - dependent variable
 
         :rtype: instance
         """
 
+        from sklearn import preprocessing
         X = self.tonp(X)
         self.le = preprocessing.LabelEncoder()
         self.le.fit(y)
@@ -99,13 +140,86 @@ class SVC(object):
         self.svc.fit(X, y)
         return self
 
+    def partial_fit(self, X, y, classes=None):
+        """Update the classifier with a new batch. The linear model is
+        trained online with :py:class:`sklearn.linear_model.SGDClassifier`
+        (hinge loss); a classifier previously trained with :py:func:`fit`
+        is used as starting point. The columns of the terms added by
+        :py:func:`b4msa.textmodel.TextModel.partial_fit` start with weight zero.
+
+        :param X: inputs - independent variables
+        :type X: lst or csr_matrix
+        :param y: output - dependent variable
+        :param classes: All the labels; required on the first call unless `y` contains all of them
+        :rtype: instance
+
+        >>> from b4msa.textmodel import TextModel
+        >>> from b4msa.classifier import SVC
+        >>> corpus = ['buenos dias', 'catedras conacyt', 'categorizacion de texto ingeotec']
+        >>> textmodel = TextModel().partial_fit(corpus)
+        >>> svc = SVC(textmodel).partial_fit([textmodel[x] for x in corpus], [1, 0, 0])
+        >>> textmodel = textmodel.partial_fit(['buenas noches'])
+        >>> svc = svc.partial_fit([textmodel['buenas noches']], [1])
+        """
+
+        from sklearn import preprocessing
+        from sklearn.linear_model import SGDClassifier
+        try:
+            num_terms = self.model.num_terms
+        except AttributeError:
+            num_terms = None
+        if num_terms is not None and (self.num_terms is None or self.num_terms < num_terms):
+            self._num_terms = num_terms
+        X = self.tonp(X)
+        if not hasattr(self, 'le'):
+            self.le = preprocessing.LabelEncoder()
+            self.le.fit(y if classes is None else classes)
+        y = self.le.transform(y)
+        svc = self.svc
+        coef = getattr(svc, 'coef_', None)
+        intercept = getattr(svc, 'intercept_', None)
+        if isinstance(svc, SGDClassifier) and coef is not None and coef.shape[1] == X.shape[1]:
+            svc.partial_fit(X, y)
+            return self
+        if not isinstance(svc, SGDClassifier):
+            svc = SGDClassifier(loss='hinge')
+        klasses = np.arange(self.le.classes_.shape[0])
+        if coef is None:
+            svc.partial_fit(X, y, classes=klasses)
+        else:
+            # one epoch starting from the current (padded) model; the missing
+            # classes are added with zero weight so that every class keeps its row
+            coef_init = np.zeros((coef.shape[0], X.shape[1]))
+            coef_init[:, :coef.shape[1]] = coef
+            missing = np.setdiff1d(klasses, y)
+            sample_weight = np.ones(X.shape[0] + missing.shape[0])
+            sample_weight[X.shape[0]:] = 0
+            X = vstack([X, csr_matrix((missing.shape[0], X.shape[1]))], format='csr')
+            y = np.concatenate((y, missing))
+            svc.set_params(max_iter=1, tol=None)
+            svc.fit(X, y, coef_init=coef_init, intercept_init=intercept,
+                    sample_weight=sample_weight)
+        self.svc = svc
+        return self
+
     def decision_function(self, Xnew):
+        """Decision function
+
+        :param Xnew: inputs
+        :type Xnew: lst or csr_matrix
+        """
         Xnew = self.tonp(Xnew)
         return self.svc.decision_function(Xnew)
 
     def predict(self, Xnew):
+        """Predict the label
+
+        :param Xnew: inputs
+        :type Xnew: lst or csr_matrix
+        """
         if self.num_terms == 0:
-            return self.le.inverse_transform(np.zeros(len(Xnew), dtype=int))
+            n = Xnew.shape[0] if issparse(Xnew) else len(Xnew)
+            return self.le.inverse_transform(np.zeros(n, dtype=int))
         Xnew = self.tonp(Xnew)
         ynew = self.svc.predict(Xnew)
         return self.le.inverse_transform(ynew)
@@ -114,22 +228,120 @@ class SVC(object):
         y = self.predict([self.model[text]])
         return y[0]
 
+    def quantize(self, dtype=np.int8):
+        """Replace the classifier by a :py:class:`QuantizedLinearSVC`
+        with the coefficients stored as `dtype`; the model is then used for prediction
+
+        :param dtype: np.int8 (with a scale factor per class) or np.float16
+        :type dtype: type
+        :rtype: instance
+
+        >>> from b4msa.textmodel import TextModel
+        >>> from b4msa.classifier import SVC
+        >>> corpus = ['buenos dias', 'catedras conacyt', 'categorizacion de texto ingeotec']
+        >>> textmodel = TextModel(corpus)
+        >>> svc = SVC(textmodel).fit(textmodel.transform(corpus), [1, 0, 0])
+        >>> svc.quantize().svc.coef_q.dtype
+        dtype('int8')
+        >>> int(svc.predict_text('buenos dias'))
+        1
+        """
+        if self.num_terms == 0:
+            return self
+        svc = self.svc
+        self.svc = QuantizedLinearSVC(svc.coef_, svc.intercept_, svc.classes_, dtype=dtype)
+        return self
+
+    def compile(self):
+        """Inference scorer with the weights of the text model and the
+        coefficients of the classifier folded into one table, see
+        :py:class:`CompiledSVC`
+
+        :rtype: :py:class:`CompiledSVC`
+
+        >>> from b4msa.textmodel import TextModel
+        >>> from b4msa.classifier import SVC
+        >>> corpus = ['buenos dias', 'catedras conacyt', 'categorizacion de texto ingeotec']
+        >>> textmodel = TextModel(corpus)
+        >>> svc = SVC(textmodel).fit(textmodel.transform(corpus), [1, 0, 0])
+        >>> scorer = svc.compile()
+        >>> int(scorer.predict_text('buenos dias')), int(svc.predict_text('buenos dias'))
+        (1, 1)
+        """
+        if self.num_terms == 0:
+            coef = np.zeros((1, 0))
+            intercept = np.zeros(1)
+        else:
+            coef = self.svc.coef_
+            intercept = self.svc.intercept_
+        return CompiledSVC(self.model, coef, intercept, self.le.classes_)
+
     def fit_file(self, fname, get_tweet='text',
                  get_klass='klass', maxitems=1e100):
         X, y = read_data_labels(fname, get_klass=get_klass,
                                 get_tweet=get_tweet, maxitems=maxitems)
-        self.fit([self.model[x] for x in X], y)
+        self.fit(self.model.transform(X), y)
         return self
 
-    def predict_file(self, fname, get_tweet='text', maxitems=1e100):
-        hy = [self.predict_text(x)
-              for x in read_data(fname, get_tweet=get_tweet,
-                                 maxitems=maxitems)]
-        return hy
+    def partial_fit_file(self, fname, get_tweet='text',
+                         get_klass='klass', chunksize=1024):
+        """Update the text model and the classifier with the documents
+        in `fname`, see :py:func:`partial_fit`"""
+        for D in chunk_iterator(tweet_iterator(fname), chunksize):
+            X = [x[get_tweet] for x in D]
+            self.model.partial_fit([{self.model._text: text, KLASS: x[get_klass]}
+                                    for text, x in zip(X, D)])
+            self.partial_fit(self.model.transform(X), [str(x[get_klass]) for x in D])
+        return self
+
+    def predict_iter(self, texts, chunksize=1024, decision_function=False):
+        """Labels of `texts` computed by chunks, i.e., each chunk is
+        transformed and predicted in one call and only one chunk is in memory
+
+        :param texts: Texts
+        :type texts: iterable
+        :param chunksize: Number of texts in each chunk
+        :type chunksize: int
+        :param decision_function: Yield the decision function instead of the label
+        :type decision_function: bool
+        :rtype: generator
+
+        >>> from b4msa.textmodel import TextModel
+        >>> from b4msa.classifier import SVC
+        >>> corpus = ['buenos dias', 'catedras conacyt', 'categorizacion de texto ingeotec']
+        >>> textmodel = TextModel(corpus)
+        >>> svc = SVC(textmodel).fit(textmodel.transform(corpus), [1, 0, 0])
+        >>> [int(x) for x in svc.predict_iter(iter(corpus), chunksize=2)]
+        [1, 0, 0]
+        """
+        for chunk in chunk_iterator(texts, chunksize):
+            X = self.model.transform(chunk)
+            if decision_function:
+                yield from self.decision_function(X)
+            else:
+                yield from self.predict(X)
+
+    def predict_file(self, fname, get_tweet='text', maxitems=1e100, chunksize=1024):
+        """Labels of the documents in `fname`, see :py:func:`predict_iter`"""
+        def texts():
+            for count, tweet in enumerate(tweet_iterator(fname), start=1):
+                yield get_tweet(tweet) if callable(get_tweet) else tweet[get_tweet]
+                if count == maxitems:
+                    break
+        return list(self.predict_iter(texts(), chunksize=chunksize))
 
     @classmethod
     def predict_kfold(cls, X, y, n_folds=10, seed=0, textModel_params={},
-                      kfolds=None, pool=None, use_tqdm=True):
+                      kfolds=None, pool=None, use_tqdm=True, tmpdir=None):
+        """Predict `X` with stratified k-fold cross-validation; the corpus is
+        tokenized once and, with a `pool`, stored in a temporary directory
+        memory-mapped by the processes (see :py:class:`b4msa.corpus.SharedCorpus`)
+
+        :param tmpdir: Directory where the temporary directory is created, by default the one of :py:func:`tempfile.mkdtemp`; a RAM-backed one holds the whole corpus in memory
+        :type tmpdir: str
+        """
+        from sklearn import preprocessing
+        from sklearn.model_selection import StratifiedKFold
         try:
             from tqdm import tqdm
         except ImportError:
@@ -142,17 +354,36 @@ class SVC(object):
         if kfolds is None:
             kfolds = StratifiedKFold(n_splits=n_folds, shuffle=True,
                                      random_state=seed).split(X, y)
-        args = [(X, y, tr, ts, textModel_params) for tr, ts in kfolds]
+        params = TextModel.params()
+        textModel_params = {k: v for k, v in textModel_params.items() if k in params}
+        # the corpus is tokenized once and the folds take their tokens from it
+        textmodel = TextModel(**textModel_params)
+        corpus = SharedCorpus(textmodel.tokenize_corpus(X, pool=pool))
+        if textmodel._per_klass:
+            corpus.klass = np.unique([x[KLASS] for x in X], return_inverse=True)[1]
         if pool is not None:
-            if use_tqdm:
-                res = [x for x in tqdm(pool.imap_unordered(cls.train_predict_pool, args),
-                                       desc='Params', total=len(args))]
-            else:
-                res = [x for x in pool.imap_unordered(cls.train_predict_pool, args)]
+            # the workers memory-map the corpus, so the tasks carry only its path
+            if textmodel._fits_counts:
+                corpus.counts = TextModel.corpus_counts(corpus.corpus)
+            path = tempfile.mkdtemp(dir=tmpdir)
+            try:
+                corpus = corpus.save(path)
+                args = [(corpus, tr, y[tr], ts, textModel_params) for tr, ts in kfolds]
+                if use_tqdm:
+                    res = [x for x in tqdm(pool.imap_unordered(cls.train_predict_corpus, args),
+                                           desc='Params', total=len(args))]
+                else:
+                    res = [x for x in pool.imap_unordered(cls.train_predict_corpus, args)]
+            finally:
+                # the memory-mapped files are released before removing them
+                # (Windows does not delete mapped files)
+                corpus = args = None
+                shutil.rmtree(path, ignore_errors=True)
         else:
+            args = [(corpus, tr, y[tr], ts, textModel_params) for tr, ts in kfolds]
             if use_tqdm:
                 args = tqdm(args)
-            res = [cls.train_predict_pool(x) for x in args]
+            res = [cls.train_predict_corpus(x) for x in args]
         for ts, _hy in res:
             hy[ts] = _hy
         return le.inverse_transform(hy)
@@ -163,32 +394,232 @@ class SVC(object):
         params = TextModel.params()
         textModel_params = {k: v for k, v in textModel_params.items() if k in params}
         t = TextModel([X[x] for x in tr], **textModel_params)
-        m = cls(t).fit([t[X[x]] for x in tr], [y[x] for x in tr])
-        return ts, np.array(m.predict([t[X[x]] for x in ts]))
+        m = cls(t).fit(t.transform([X[x] for x in tr]), [y[x] for x in tr])
+        return ts, np.array(m.predict(t.transform([X[x] for x in ts])))
 
     @classmethod
-    def predict_kfold_params(cls, fname, n_folds=10, score=None, numprocs=None, seed=0, param_kwargs={}):
-        from b4msa.params import ParameterSelection, Wrapper
-        X, y = read_data_labels(fname)
-        if numprocs is not None:
-            pool = Pool(numprocs)
-        else:
-            pool = None
-            numprocs = 1
+    def train_predict_corpus(cls, args):
+        """Train with the texts `tr` and predict the texts `ts` of a corpus
+        tokenized by :py:func:`b4msa.textmodel.TextModel.tokenize_corpus`
+        (the text model of the fold is computed from the count matrix, see
+        :py:func:`b4msa.textmodel.TextModel.fit_corpus`); the predictions are
+        the ones of :py:func:`train_predict_pool`. `args` is the corpus as a
+        :py:class:`b4msa.corpus.SharedCorpus`, the training texts, their
+        labels, the test texts, and the text model parameters"""
+        shared, tr, y, ts, textModel_params = args
+        corpus = shared.corpus
+        t = TextModel(**textModel_params)
+        t.fit_corpus(corpus, tr, counts=shared.counts if t._fits_counts else None,
+                     klass=shared.klass)
+        m = cls(t).fit(t.transform_corpus(corpus, tr), y)
+        return ts, np.array(m.predict(t.transform_corpus(corpus, ts)))
 
-        if n_folds % numprocs == 0:
-            f = Wrapper(X, y, score, n_folds, cls, pool=pool, seed=seed)
-            pool = None
-        else:
+    @classmethod
+    def predict_kfold_params(cls, fname, n_folds=10, score=None, numprocs=None, seed=0, param_kwargs={},
+                             tmpdir=None):
+        from b4msa.params import ParameterSelection, Wrapper, _init_wrapper, _wrapper_f
+        from multiprocessing import Pool
+        X, y = read_data_labels(fname)
+        if numprocs is None:
             f = Wrapper(X, y, score, n_folds, cls, seed=seed)
-
-        return ParameterSelection().search(f.f, pool=pool, **param_kwargs)
+            return ParameterSelection().search(f.f, **param_kwargs)
+        if n_folds % numprocs == 0:
+            # the folds of each configuration are computed in parallel
+            with Pool(numprocs) as pool:
+                f = Wrapper(X, y, score, n_folds, cls, pool=pool, seed=seed, tmpdir=tmpdir)
+                return ParameterSelection().search(f.f, **param_kwargs)
+        # the configurations are computed in parallel; the workers receive
+        # the corpus once, when they start, instead of with every configuration
+        f = Wrapper(X, y, score, n_folds, cls, seed=seed)
+        with Pool(numprocs, initializer=_init_wrapper, initargs=(f,)) as pool:
+            return ParameterSelection().search(_wrapper_f, pool=pool, **param_kwargs)
 
     @classmethod
-    def fit_from_file(cls, fname, textModel_params={}):
-        D = [x for x in tweet_iterator(fname)]
-        # X, y = read_data_labels(fname)
-        y = [x['klass'] for x in D]
-        model = TextModel(D, **textModel_params)
+    def fit_from_file(cls, fname, textModel_params={}, chunksize=1024, n_jobs=1):
+        """Train the text model and the classifier reading `fname` in chunks,
+        see :py:func:`b4msa.textmodel.TextModel.fit_iter`
+
+        :param fname: Path to the training set (json lines, optionally gzip)
+        :type fname: str
+        :param textModel_params: Text model parameters
+        :type textModel_params: dict
+        :param chunksize: Number of documents in each chunk
+        :type chunksize: int
+        :param n_jobs: Number of processes
+        :type n_jobs: int
+        :rtype: instance
+        """
+
+        model = TextModel(**textModel_params).fit_iter(tweet_iterator(fname),
+                                                       chunksize=chunksize,
+                                                       n_jobs=n_jobs)
+        X = []
+        y = []
+        for D in chunk_iterator(tweet_iterator(fname), chunksize):
+            X.append(model.transform(D))
+            y.extend([x['klass'] for x in D])
         svc = cls(model)
-        return svc.fit([model[x] for x in D], y)
+        return svc.fit(vstack(X, format='csr'), y)
+
+
+class QuantizedLinearSVC(object):
+    """Linear classifier with the coefficients stored as int8, with one
+    scale factor per class, or as float16; it takes the place of the
+    classifier of :py:class:`SVC` (see :py:func:`SVC.quantize`) and predicts
+    without restoring the float64 coefficients
+
+    :param coef: Coefficients (classifiers x terms)
+    :type coef: np.array
+    :param intercept: Intercept
+    :type intercept: np.array
+    :param classes: Classes of the linear classifier
+    :type classes: np.array
+    :param dtype: np.int8 or np.float16
+    :type dtype: type
+    """
+
+    def __init__(self, coef, intercept, classes, dtype=np.int8):
+        coef = np.asarray(coef, dtype=np.float64)
+        dtype = np.dtype(dtype)
+        if dtype == np.int8:
+            scale = np.abs(coef).max(axis=1, initial=0) / 127
+            scale[scale == 0] = 1
+            self.coef_q = np.round(coef / scale[:, np.newaxis]).astype(np.int8)
+        elif dtype == np.float16:
+            scale = np.ones(coef.shape[0])
+            self.coef_q = coef.astype(np.float16)
+        else:
+            raise ValueError("Unsupported dtype: %s" % dtype)
+        self.scale = scale
+        self.intercept_ = np.asarray(intercept, dtype=np.float64)
+        self.classes_ = classes
+
+    @property
+    def coef_(self):
+        """Coefficients restored as float64"""
+        return self.coef_q.astype(np.float64) * self.scale[:, np.newaxis]
+
+    def decision_function(self, X):
+        """Decision function
+
+        :param X: inputs
+        :type X: csr_matrix
+        :rtype: np.array
+        """
+        X = csr_matrix(X)
+        nrows = X.shape[0]
+        rows = np.repeat(np.arange(nrows), np.diff(X.indptr))
+        scores = np.empty((nrows, self.coef_q.shape[0]))
+        for k, (coef, scale) in enumerate(zip(self.coef_q, self.scale)):
+            scores[:, k] = np.bincount(rows, weights=X.data * coef[X.indices],
+                                       minlength=nrows) * scale
+        scores += self.intercept_
+        if scores.shape[1] == 1:
+            return scores[:, 0]
+        return scores
+
+    def predict(self, X):
+        """Predict the class
+
+        :param X: inputs
+        :type X: csr_matrix
+        :rtype: np.array
+        """
+        scores = self.decision_function(X)
+        if scores.ndim == 1:
+            return self.classes_[(scores > 0).astype(int)]
+        return self.classes_[scores.argmax(axis=1)]
+
+
+class CompiledSVC(object):
+    """Linear scorer of a trained :py:class:`SVC`. The table `weight` has
+    a row per token with the coefficients of each class multiplied by the
+    weight of the token in the text model, so the decision function of a text
+    is the sum of the rows of its tokens (times their frequency) divided by
+    the norm of its vector plus the intercept; no sparse matrix is built.
+
+    :param textmodel: Text model
+    :type textmodel: :py:class:`b4msa.textmodel.TextModel`
+    :param coef: Coefficients of the linear classifier (classifiers x terms)
+    :type coef: np.array
+    :param intercept: Intercept of the linear classifier
+    :type intercept: np.array
+    :param classes: Labels
+    :type classes: np.array
+    """
+
+    def __init__(self, textmodel, coef, intercept, classes):
+        model = textmodel.model
+        if isinstance(model, HashingTFIDF):
+            raise RuntimeError("The hashing mode does not have token identifiers")
+        self.textmodel = textmodel
+        self.classes_ = classes
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.idf = weight_array(model)
+        coef = np.asarray(coef, dtype=np.float64)
+        # the terms added after training the classifier have coefficient zero
+        n = min(coef.shape[1], model.num_terms)
+        weight = np.zeros((model.num_terms, coef.shape[0]))
+        weight[:n] = coef[:, :n].T * self.idf[:n, np.newaxis]
+        self.weight = weight
+        self.entropy = isinstance(model, Entropy)
+        self.unit_vector = not isinstance(model, TF) and model.unit_vector
+
+    def decision_function_ids(self, ids):
+        """Decision function of a text given the identifiers of its tokens
+        (see :py:func:`b4msa.textmodel.TextModel.token_ids`)
+
+        :param ids: Token identifiers with repetitions
+        :type ids: list
+        :rtype: np.array
+        """
+        if len(ids) == 0:
+            return self.intercept
+        counts = DocCounter(ids)
+        ids = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+        tf = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        rows = self.weight[ids]
+        if self.entropy:
+            return rows.sum(axis=0) + self.intercept
+        score = tf @ rows
+        if self.unit_vector:
+            tf_idf = tf * self.idf[ids]
+            norm = np.sqrt(tf_idf @ tf_idf)
+            if norm == 0:
+                return self.intercept
+            return score / norm + self.intercept
+        return score / tf.sum() + self.intercept
+
+    def decision_function(self, texts):
+        """Decision function
+
+        :param texts: Texts
+        :type texts: list
+        :rtype: np.array
+        """
+        token_ids = self.textmodel.token_ids
+        hy = np.array([self.decision_function_ids(token_ids(x)) for x in texts])
+        if hy.ndim == 2 and hy.shape[1] == 1:
+            return hy[:, 0]
+        return hy
+
+    def _label(self, score):
+        if score.shape[0] == 1:
+            return self.classes_[int(score[0] > 0)]
+        return self.classes_[score.argmax()]
+
+    def predict(self, texts):
+        """Predict the label
+
+        :param texts: Texts
+        :type texts: list
+        :rtype: np.array
+        """
+        hy = self.decision_function(texts)
+        if hy.ndim == 1:
+            return self.classes_[(hy > 0).astype(int)]
+        return self.classes_[hy.argmax(axis=1)]
+
+    def predict_text(self, text):
+        """Label of `text`"""
+        return self._label(self.decision_function_ids(self.textmodel.token_ids(text)))
@@ -14,12 +14,12 @@
 import argparse
 import b4msa
 from b4msa.classifier import SVC
-from microtc.utils import read_data, tweet_iterator, read_data_labels, load_model, save_model
+from microtc.utils import tweet_iterator, read_data_labels, save_model
+from microtc.utils import TEXT
 from b4msa.textmodel import TextModel
+from b4msa.utils import chunk_iterator
+from b4msa.vocabulary import load_model
 # from b4msa.params import OPTION_DELETE
-from multiprocessing import cpu_count
-from sklearn.preprocessing import LabelEncoder
-from sklearn.model_selection import KFold
 import json
 import gzip
 
@@ -90,6 +90,8 @@ class CommandLine(object):
            help="Determines if hillclimbing search is also perfomed to improve the selection of paramters")
         pa('-n', '--numprocs', dest='numprocs', type=int, default=1,
            help="Number of processes to compute the best setup")
+        pa('--tmpdir', dest='tmpdir', type=str, default=None,
+           help="Directory of the tokenized corpus shared by the processes (default: the system temporary directory)")
         pa('-S', '--score', dest='score', type=str, default='macrorecall',
            help="The name of the score to be optimized (macrorecall|macrof1|weightedf1|accuracy|avgf1:klass1:klass2); it defaults to macrof1")
 
@@ -109,6 +111,7 @@ class CommandLine(object):
         if self.data.numprocs == 1:
             numprocs = None
         elif self.data.numprocs == 0:
+            from multiprocessing import cpu_count
             numprocs = cpu_count()
         else:
             numprocs = self.data.numprocs
@@ -123,6 +126,7 @@ class CommandLine(object):
             score=self.data.score,
             numprocs=numprocs,
             seed=self.data.seed,
+            tmpdir=self.data.tmpdir,
             param_kwargs=dict(
                 bsize=self.data.samplesize,
                 hill_climbing=self.data.hill_climbing,
@@ -154,6 +158,12 @@ class CommandLineTrain(CommandLine):
            required=False, help="TextModel params")
         pa('--kw', dest='kwargs', default=None, type=str,
            help='Parameters in json that overwrite b4msa default parameters')
+        pa('--vocabulary', dest='vocabulary', default=None, type=str,
+           help='Store the vocabulary in this file (memory-mapped when the model is loaded; keep it next to the model when moving the model)')
+        pa('--update', dest='update', default=None, type=str,
+           help='Model to be updated (partial_fit) with the training set instead of training a new one')
+        pa('--quantize', dest='quantize', default=None, type=str, choices=['int8', 'float16'],
+           help='Store the coefficients of the classifier as int8 (one scale factor per class) or float16')
 
     def main(self):
         self.data = self.parser.parse_args()
@@ -167,7 +177,14 @@ class CommandLineTrain(CommandLine):
         best = clean_params(best)
         kw = json.loads(self.data.kwargs) if self.data.kwargs is not None else dict()
         best.update(kw)
-        svc = SVC.fit_from_file(self.data.training_set, best)
+        if self.data.update is not None:
+            svc = load_model(self.data.update).partial_fit_file(self.data.training_set)
+        else:
+            svc = SVC.fit_from_file(self.data.training_set, best)
+        if self.data.vocabulary is not None:
+            svc.model.save_vocabulary(self.data.vocabulary)
+        if self.data.quantize is not None:
+            svc.quantize(self.data.quantize)
         save_model(svc, self.get_output())
 
 
@@ -198,7 +215,6 @@ class CommandLineTest(CommandLine):
     def main(self):
         self.data = self.parser.parse_args()
         svc = load_model(self.data.model)
-        X = [svc.model[x] for x in read_data(self.data.test_set)]
         output = self.get_output()
         if output.endswith('.gz'):
             gzip_flag = True
@@ -206,25 +222,31 @@ class CommandLineTest(CommandLine):
         else:
             gzip_flag = False
             output = open(output, 'w')
+        # the test set is read, predicted and written by chunks
         with output as fpt:
-            if not self.data.decision_function:
-                hy = svc.predict(X)
-                for tweet, klass in zip(tweet_iterator(self.data.test_set), hy):
-                    tweet['klass'] = str(klass)
-                    cdn = json.dumps(tweet)+"\n"
-                    cdn = bytes(cdn, encoding='utf-8') if gzip_flag else cdn
-                    fpt.write(cdn)
-            else:
-                hy = svc.decision_function(X)
-                for tweet, klass in zip(tweet_iterator(self.data.test_set), hy):
-                    try:
-                        o = klass.tolist()
-                    except AttributeError:
-                        o = klass
-                    tweet['decision_function'] = o
-                    cdn = json.dumps(tweet)+"\n"
-                    cdn = bytes(cdn, encoding='utf-8') if gzip_flag else cdn
-                    fpt.write(cdn)
+            for D in chunk_iterator(tweet_iterator(self.data.test_set), 1024):
+                self.write_chunk(fpt, svc, D, gzip_flag)
+
+    def write_chunk(self, fpt, svc, D, gzip_flag):
+        X = svc.model.transform([x[TEXT] for x in D])
+        if not self.data.decision_function:
+            hy = svc.predict(X)
+            for tweet, klass in zip(D, hy):
+                tweet['klass'] = str(klass)
+                cdn = json.dumps(tweet)+"\n"
+                cdn = bytes(cdn, encoding='utf-8') if gzip_flag else cdn
+                fpt.write(cdn)
+        else:
+            hy = svc.decision_function(X)
+            for tweet, klass in zip(D, hy):
+                try:
+                    o = klass.tolist()
+                except AttributeError:
+                    o = klass
+                tweet['decision_function'] = o
+                cdn = json.dumps(tweet)+"\n"
+                cdn = bytes(cdn, encoding='utf-8') if gzip_flag else cdn
+                fpt.write(cdn)
 
 
 class CommandLineTextModel(CommandLineTest):
@@ -256,6 +278,8 @@ class CommandLineKfolds(CommandLineTrain):
 
     def main(self, args=None):
         self.data = self.parser.parse_args(args=args)
+        from sklearn.preprocessing import LabelEncoder
+        from sklearn.model_selection import KFold
         assert not self.data.update_klass
         best = load_json(self.data.params_fname)
         if isinstance(best, list):
@@ -267,13 +291,13 @@ class CommandLineKfolds(CommandLineTrain):
         le.fit(labels)
         y = le.transform(labels)
         t = TextModel(corpus, **best)
-        X = [t[x] for x in corpus]
+        X = t.transform(corpus)
         hy = [None for x in y]
         for tr, ts in KFold(n_splits=self.data.kratio,
                             shuffle=True, random_state=self.data.seed).split(X):
             c = SVC(model=t)
-            c.fit([X[x] for x in tr], [y[x] for x in tr])
-            _ = c.decision_function([X[x] for x in ts])
+            c.fit(X[tr], [y[x] for x in tr])
+            _ = c.decision_function(X[ts])
             [hy.__setitem__(k, v) for k, v in zip(ts, _)]
 
         i = 0
@@ -0,0 +1,142 @@
+# Copyright 2016 Mario Graff (https://github.com/mgraffg)
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import pickle
+import numpy as np
+from scipy.sparse import csr_matrix
+from .textmodel import TextModel
+
+
+_ARRAYS = ['indptr', 'ids', 'counts_indptr', 'counts_indices', 'counts_data']
+_VOCABULARY = (None, None)
+
+
+def _read_vocabulary(path):
+    """Vocabulary and shape of the count matrix stored in `path`; the process
+    keeps the last one read, so the tasks of a worker on the same corpus
+    unpickle the vocabulary once"""
+    global _VOCABULARY
+    fname = os.path.join(path, 'vocabulary.pickle')
+    stat = os.stat(fname)
+    key = (os.path.abspath(fname), stat.st_mtime_ns, stat.st_size)
+    if _VOCABULARY[0] != key:
+        with open(fname, 'rb') as fpt:
+            _VOCABULARY = (key, pickle.load(fpt))
+    return _VOCABULARY[1]
+
+
+class SharedCorpus(object):
+    """Tokenized corpus (see :py:func:`b4msa.textmodel.TextModel.tokenize_corpus`),
+    its count matrix (see :py:func:`b4msa.textmodel.TextModel.corpus_counts`),
+    and the class of each text encoded as an integer.
+
+    :py:func:`save` stores the arrays in a directory and returns the corpus
+    with the arrays memory-mapped; pickling it stores only the path, so the
+    tasks sent to a pool carry the path and the processes share one
+    physical copy of the corpus. The count matrix is computed on first use
+    and stored only when it has been computed.
+
+    :param corpus: Output of :py:func:`b4msa.textmodel.TextModel.tokenize_corpus`
+    :type corpus: tuple
+    :param counts: Output of :py:func:`b4msa.textmodel.TextModel.corpus_counts`
+    :type counts: csr_matrix
+    :param klass: Class of each text encoded as an integer
+    :type klass: np.array
+
+    >>> import pickle, tempfile
+    >>> from b4msa.textmodel import TextModel
+    >>> from b4msa.corpus import SharedCorpus
+    >>> corpus = TextModel(token_list=[-1]).tokenize_corpus(['buenos dias', 'buenas noches'])
+    >>> shared = SharedCorpus(corpus).save(tempfile.mkdtemp())
+    >>> len(pickle.dumps(shared)) < 200
+    True
+    >>> TextModel.corpus_tokens(pickle.loads(pickle.dumps(shared)).corpus, [1])
+    [['buenas', 'noches']]
+    """
+
+    def __init__(self, corpus, counts=None, klass=None):
+        self.corpus = corpus
+        self._counts = counts
+        self.klass = klass
+        self.path = None
+
+    @property
+    def counts(self):
+        """Count matrix of the corpus (see :py:func:`b4msa.textmodel.TextModel.corpus_counts`),
+        computed on first use
+
+        :rtype: csr_matrix
+        """
+        if self._counts is None:
+            self._counts = TextModel.corpus_counts(self.corpus)
+        return self._counts
+
+    @counts.setter
+    def counts(self, value):
+        self._counts = value
+
+    def save(self, path):
+        """Store the corpus in the directory `path`
+
+        :param path: Directory
+        :type path: str
+        :rtype: :py:class:`SharedCorpus` - memory-mapped corpus
+        """
+
+        vocabulary, indptr, ids = self.corpus
+        counts = self._counts
+        arrays = dict(indptr=indptr, ids=ids)
+        if counts is not None:
+            arrays.update(counts_indptr=counts.indptr, counts_indices=counts.indices,
+                          counts_data=counts.data)
+        if self.klass is not None:
+            arrays['klass'] = np.asarray(self.klass)
+        for name, array in arrays.items():
+            np.save(os.path.join(path, name + '.npy'), array)
+        shape = None if counts is None else counts.shape
+        with open(os.path.join(path, 'vocabulary.pickle'), 'wb') as fpt:
+            pickle.dump((vocabulary, shape), fpt, protocol=4)
+        return self._open(path, vocabulary, shape)
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map the corpus stored by :py:func:`save` in `path`; the
+        vocabulary is read once per process
+
+        :param path: Directory
+        :type path: str
+        :rtype: :py:class:`SharedCorpus`
+        """
+
+        vocabulary, shape = _read_vocabulary(path)
+        return cls._open(path, vocabulary, shape)
+
+    @classmethod
+    def _open(cls, path, vocabulary, shape):
+        def load(name):
+            fname = os.path.join(path, name + '.npy')
+            return np.load(fname, mmap_mode='r') if os.path.isfile(fname) else None
+
+        indptr, ids, c_indptr, c_indices, c_data, klass = [load(x) for x in _ARRAYS + ['klass']]
+        counts = None
+        if shape is not None:
+            counts = csr_matrix((c_data, c_indices, c_indptr), shape=shape, copy=False)
+        shared = cls((vocabulary, indptr, ids), counts=counts, klass=klass)
+        shared.path = path
+        return shared
+
+    def __reduce__(self):
+        if self.path is None:
+            return (SharedCorpus, (self.corpus, self._counts, self.klass))
+        return (SharedCorpus.load, (self.path,))
@@ -18,12 +18,21 @@
 import io
 import re
 import os
-from b4msa.params import OPTION_NONE
+import pickle
+import threading
+from types import MappingProxyType
+from microtc.utils import save_model, load_model
+from b4msa.params import OPTION_NONE, OPTION_GROUP, OPTION_DELETE
+from b4msa.utils import LRUCache
 
 idModule = "language_dependency"
 
 
 PATH = os.path.join(os.path.dirname(__file__), 'resources')
+RESOURCE_PACK = os.path.join(PATH, 'lang.pack')
+_PACK = None
+_REGISTRY = dict()
+_REGISTRY_LOCK = threading.RLock()
 
 
 _HASHTAG = '#'
@@ -38,6 +47,119 @@ _sNEGATIVE = "_neg"
 _sPOSITIVE = "_pos"
 _sNEUTRAL = "_neu"
 
+_TAGS = "|".join([_sURL_TAG, _sUSER_TAG, _sENTITY_TAG, _sHASH_TAG, _sNUM_TAG,
+                  _sNEGATIVE, _sPOSITIVE, _sNEUTRAL]) + "|"
+# words skipped, besides the neg.stopwords, between the negation and the negated word
+_SKIP_WORDS = dict(spanish="me|te|se|lo|les|le|los",
+                   english="me|you|he|she|it|us|the",
+                   italian="mi|ti|lo|gli|le|ne|li|glieli|glielo|gliela|gliene|gliele")
+_NEGATION_MARKER = dict(spanish="no", english="not", italian="no")
+_SPACES = re.compile(r"\s+")
+_ISOLATED_NO = re.compile(r"\b(no_)\b", flags=re.I)
+_ISOLATED_NOT = re.compile(r"\b(not_)\b", flags=re.I)
+_ES_MARKERS = re.compile(r"\b(jam[aá]s|nunca|sin|ni|nada)\b", flags=re.I)
+_ES_REPEATED = re.compile(r"\b(jam[aá]s|nunca|sin|no|nada)(\s+\1)+", flags=re.I)
+_IT_MARKERS = re.compile(r"\b(mai|senza|non|no|né|ne)\b", flags=re.I)
+_IT_REPEATED = re.compile(r"\b(mai|senza|non|no|né|ne)(\s+\1)+", flags=re.I)
+# can't, won't, shan't, cannot, and the remaining n't in one pass
+_EN_CONTRACTIONS = re.compile(r"\b(?:(?P<ca>ca)n't|(?P<w>w)on't|(?P<sha>sha)n't|(?P<can>can)not|"
+                              r"(?P<word>[a-z]+)n't)\b", flags=re.I)
+_EN_EXPANSION = dict(ca="{0}n not ", w="{0}ill not ", sha="{0}ll not ", can="{0} not ",
+                     word="{0} not ")
+_EN_ANY = re.compile(r"(?P<neg>(\bnot\b))(?P<text>(\s+([^\s]+?)\s+)+?)(?P<any>any\b)", flags=re.I)
+_EN_MARKERS = re.compile(r"\b(not|no|never|nor|neither)\b", flags=re.I)
+
+
+# tokens starting with these characters are not stemmed
+_NOT_STEMMED = ('@', '#', '_', '~')
+
+
+def _expand_contraction(m):
+    return _EN_EXPANSION[m.lastgroup].format(m.group(m.lastgroup))
+
+
+def resource_pack():
+    """Per-language resources stored by :py:func:`build_resource_pack`, it
+    is read once; the dictionary is empty when the pack does not exist"""
+    global _PACK
+    if _PACK is None:
+        try:
+            with open(RESOURCE_PACK, 'rb') as fpt:
+                _PACK = pickle.loads(fpt.read())
+        except FileNotFoundError:
+            _PACK = dict()
+    return _PACK
+
+
+def build_resource_pack(fname=RESOURCE_PACK):
+    """Store in one file the stopwords (indexed by length and as a set), the
+    neg-stopwords, and the words skipped by the negation (`skip_words`) of
+    every language; the pack is used by :py:class:`LangDependency` instead
+    of the text files in the resources directory
+
+    :param fname: Path
+    :type fname: str
+    """
+    data = dict()
+    for lang in LangDependency().languages:
+        ld = LangDependency(lang)
+        entry = dict()
+        path = os.path.join(PATH, "{0}.stopwords".format(lang))
+        if os.path.isfile(path):
+            stw = _length_index(ld.load_stopwords(path))
+            entry['stopwords'] = stw
+            entry['stopword_set'] = frozenset().union(*stw.values())
+        path = os.path.join(PATH, "{0}.neg.stopwords".format(lang))
+        if os.path.isfile(path):
+            entry['neg_stopwords'] = ld.load_stopwords(path)
+            if lang in _SKIP_WORDS:
+                entry['skip_words'] = _SKIP_WORDS[lang] + "|" + "|".join(entry['neg_stopwords'])
+        if len(entry):
+            data[lang] = entry
+    tmp = fname + '.tmp'
+    with open(tmp, 'wb') as fpt:
+        pickle.dump(data, fpt, protocol=4)
+    os.replace(tmp, fname)
+
+
+def _length_index(words):
+    stw = dict()
+    for x in words:
+        stw.setdefault(len(x), set()).add(x)
+    return {k: frozenset(v) for k, v in stw.items()}
+
+
+def get_lang_dependency(lang):
+    """:py:class:`LangDependency` of `lang` shared by the whole process; the
+    stopwords and the negation pattern are built when the instance is
+    created, and the stemmer on first use. It is safe to call from several
+    threads, and a pickled instance is restored as the shared one.
+
+    :param lang: Language
+    :type lang: str
+    :rtype: :py:class:`LangDependency`
+
+    >>> from b4msa.lang_dependency import get_lang_dependency
+    >>> get_lang_dependency('es') is get_lang_dependency('spanish')
+    True
+    """
+    lang = get_lang(lang)
+    output = _REGISTRY.get(lang, None)
+    if output is not None:
+        return output
+    with _REGISTRY_LOCK:
+        output = _REGISTRY.get(lang, None)
+        if output is None:
+            output = LangDependency(lang)
+            # not every language has stopwords or negation rules
+            for attr in ['stopword_set', 'neg_stopwords', 'negation_pattern']:
+                try:
+                    getattr(output, attr)
+                except LangDependencyError:
+                    pass
+            _REGISTRY[lang] = output
+    return output
+
 
 def get_lang(l):
     """Convert language abbr to full names"""
@@ -70,7 +192,10 @@ class LangDependency():
     :type lang: str
     """
     STOPWORDS_CACHE = {}
+    STOPWORD_SET_CACHE = {}
     NEG_STOPWORDS_CACHE = {}
+    STEM_CACHE = {}
+    STEM_CACHE_SIZE = 2**17
 
     def __init__(self, lang="spanish"):
         """
@@ -86,11 +211,14 @@ class LangDependency():
     @property
     def stemmer(self):
         """stemmer"""
-        from nltk.stem.snowball import SnowballStemmer        
-
         try:
             return self._stemmer
         except AttributeError:
+            pass
+        with _REGISTRY_LOCK:
+            if hasattr(self, '_stemmer'):
+                return self._stemmer
+            from nltk.stem.snowball import SnowballStemmer
             if self.lang not in SnowballStemmer.languages and self.lang != 'chinese':
                 _ = f"Language not supported for stemming: {self.lang}"
                 raise LangDependencyError(_)
@@ -103,6 +231,63 @@ class LangDependency():
                 self._stemmer = SnowballStemmer(self.lang)
             return self._stemmer
 
+    @property
+    def stem_cache(self):
+        """Word to stem memo (:py:class:`b4msa.utils.LRUCache`) shared by the
+        instances of the same language; it keeps at most `STEM_CACHE_SIZE`
+        words and its `hit_rate` tells the fraction of words found"""
+        try:
+            return self._stem_cache
+        except AttributeError:
+            self._stem_cache = self.get_stem_cache(self.lang)
+        return self._stem_cache
+
+    @classmethod
+    def get_stem_cache(cls, lang):
+        """Stemming memo of `lang`"""
+        lang = get_lang(lang)
+        cache = cls.STEM_CACHE.get(lang, None)
+        if cache is None:
+            cache = cls.STEM_CACHE[lang] = LRUCache(cls.STEM_CACHE_SIZE)
+        return cache
+
+    @classmethod
+    def save_stem_cache(cls, fname):
+        """Store the stemming memo of every language, e.g., to start the
+        worker processes with :py:func:`load_stem_cache`
+
+        :param fname: Path
+        :type fname: str
+        """
+        data = {lang: list(cache.items()) for lang, cache in cls.STEM_CACHE.items()}
+        tmp = fname + '.tmp'
+        save_model(data, tmp)
+        os.replace(tmp, fname)
+
+    @classmethod
+    def load_stem_cache(cls, fname):
+        """Add the words stored by :py:func:`save_stem_cache` to the stemming memo
+
+        :param fname: Path
+        :type fname: str
+
+        >>> import os, tempfile
+        >>> from b4msa.lang_dependency import LangDependency
+        >>> lang = LangDependency('spanish')
+        >>> lang.stemming('los~carros')
+        'los~carr'
+        >>> fname = os.path.join(tempfile.mkdtemp(), 'stem')
+        >>> LangDependency.save_stem_cache(fname)
+        >>> lang.stem_cache.clear()
+        >>> LangDependency.load_stem_cache(fname)
+        >>> lang.stem_cache.get('carros')
+        'carr'
+        """
+        for lang, items in load_model(fname).items():
+            cache = cls.get_stem_cache(lang)
+            for k, v in items:
+                cache[k] = v
+
     @property
     def lang(self):
         return self._lang
@@ -121,6 +306,8 @@ class LangDependency():
             if self.lang not in self.languages:
                 raise LangDependencyError("Language not supported: " + lang)
             self._neg_stopwords = LangDependency.NEG_STOPWORDS_CACHE.get(lang, None)
+            if self._neg_stopwords is None:
+                self._neg_stopwords = resource_pack().get(lang, {}).get('neg_stopwords', None)
             if self._neg_stopwords is None:
                 self._neg_stopwords = self.load_stopwords(os.path.join(PATH, "{0}.neg.stopwords".format(lang)))
                 LangDependency.NEG_STOPWORDS_CACHE[lang] = self._neg_stopwords
@@ -128,27 +315,44 @@ class LangDependency():
 
     @property
     def stopwords(self):
-        """Stop words read from resources directory"""
+        """Stop words read from the resource pack or the resources directory,
+        indexed by length. The index is read-only and shared by the instances
+        of the same language"""
         try:
             return self._stopwords
         except AttributeError:
             lang = self.lang
             if self.lang not in self.languages:
                 raise LangDependencyError("Language not supported: " + lang)
-            self._stopwords = LangDependency.STOPWORDS_CACHE.get(lang, None)
-            if self._stopwords is None:
-                self._stopwords = self.load_stopwords(os.path.join(PATH, "{0}.stopwords".format(lang)))
-                LangDependency.STOPWORDS_CACHE[lang] = self._stopwords
-        stw = dict()
-        for x in self._stopwords:
-            try:
-                ident = len(x)
-                stw[ident][x] = 1
-            except KeyError:
-                stw[ident] = {x: 1}
-        self._stopwords = stw
+            index = LangDependency.STOPWORDS_CACHE.get(lang, None)
+            if index is None:
+                stw = resource_pack().get(lang, {}).get('stopwords', None)
+                if stw is None:
+                    stw = _length_index(self.load_stopwords(os.path.join(PATH, "{0}.stopwords".format(lang))))
+                index = MappingProxyType(stw)
+                LangDependency.STOPWORDS_CACHE[lang] = index
+            self._stopwords = index
         return self._stopwords
 
+    @property
+    def stopword_set(self):
+        """All the stop words in one frozenset"""
+        try:
+            return self._stopword_set
+        except AttributeError:
+            stopwords = self.stopwords
+            self._stopword_set = LangDependency.STOPWORD_SET_CACHE.get(self.lang, None)
+            if self._stopword_set is None:
+                self._stopword_set = resource_pack().get(self.lang, {}).get('stopword_set', None)
+            if self._stopword_set is None:
+                self._stopword_set = frozenset().union(*stopwords.values())
+                LangDependency.STOPWORD_SET_CACHE[self.lang] = self._stopword_set
+        return self._stopword_set
+
+    def __reduce__(self):
+        # restored as the instance of the registry (see get_lang_dependency)
+        return get_lang_dependency, (self.lang, )
+
     def load_stopwords(self, fileName):
         """Load stopwords from file"""
         if not os.path.isfile(fileName):
@@ -169,14 +373,40 @@ class LangDependency():
     def stemming(self, text):
         """Applies the stemming process to `text` parameter"""
 
-        tokens = re.split(r"~", text.strip())
-        t = []
+        return "~".join(self.process_tokens(text.strip().split('~'), stemming=True))
+
+    def process_tokens(self, tokens, stemming=False, stopwords=OPTION_NONE):
+        """Stemming and stopwords of a list of tokens in one pass; the
+        stopwords are searched after stemming as in :py:func:`transform`
+
+        :param tokens: Tokens
+        :type tokens: list
+        :param stemming: Stemming
+        :type stemming: bool
+        :param stopwords: Stopwords (none | group | delete)
+        :type stopwords: str
+        :rtype: list
+        """
+        if stopwords == OPTION_DELETE or stopwords == OPTION_GROUP:
+            sw = self.stopword_set
+            delete = stopwords == OPTION_DELETE
+        else:
+            sw = None
+        if stemming:
+            cache = self.stem_cache
+        output = []
         for tok in tokens:
-            if re.search(r"^(@|#|_|~)", tok, flags=re.I):
-                t.append(tok)
-            else:
-                t.append(self.stemmer.stem(tok))
-        return "~".join(t)
+            if stemming and tok[:1] not in _NOT_STEMMED:
+                stem = cache.get(tok)
+                if stem is None:
+                    stem = cache[tok] = self.stemmer.stem(tok)
+                tok = stem
+            if sw is not None and tok in sw:
+                if delete:
+                    continue
+                tok = "_sw"
+            output.append(tok)
+        return output
 
     def negation(self, text):
         """Applies negation process to the given text"""
@@ -192,35 +422,43 @@ class LangDependency():
 
         return text
 
+    @property
+    def negation_pattern(self):
+        """Regular expression that attaches the negation marker to the next
+        word, skipping the words in `skip_words`; it is compiled once per instance"""
+        try:
+            return self._negation_pattern
+        except AttributeError:
+            lang = self.lang
+            if lang not in _NEGATION_MARKER:
+                raise LangDependencyError("Negation - language not defined")
+            if getattr(self, 'skip_words', None) is None:
+                self.skip_words = resource_pack().get(lang, {}).get('skip_words', None)
+            if self.skip_words is None:
+                self.skip_words = _SKIP_WORDS[lang] + "|" + "|".join(self.neg_stopwords)
+            # the last group has always been (\s+|<backspace>|$), i.e., not a word boundary
+            self._negation_pattern = re.compile(r"(?P<neg>((\s+|\b|^)" + _NEGATION_MARKER[lang] +
+                                                r"))(?P<sk_words>(\s+(" + self.skip_words + "|" +
+                                                _TAGS + r"))*)\s+(?P<text>(?!(" + _TAGS +
+                                                r")(\s+|\x08|$)))", flags=re.I)
+        return self._negation_pattern
+
     def spanish_negation(self, text):
         """
         Standarizes negation sentences, nouns are also considering with the operator "sin" (without)
         Markers like ninguno, ningún, nadie are considered as another word.
         """
-        if getattr(self, 'skip_words', None) is None:
-            self.skip_words = "me|te|se|lo|les|le|los"
-            self.skip_words = self.skip_words + "|" + "|".join(self.neg_stopwords)
-
+        p1 = self.negation_pattern
         text = text.replace('~', ' ')
-        tags = _sURL_TAG + "|" + _sUSER_TAG + "|" + _sENTITY_TAG + "|" + \
-               _sHASH_TAG + "|" + \
-               _sNUM_TAG + "|" + _sNEGATIVE + "|" + \
-               _sPOSITIVE + "|" + _sNEUTRAL + "|"
-
         # unifies negation markers under the "no" marker
-        text = re.sub(r"\b(jam[aá]s|nunca|sin|ni|nada)\b", " no ", text, flags=re.I)
+        text = _ES_MARKERS.sub(" no ", text)
         # reduces to unique negation marker
-        text = re.sub(r"\b(jam[aá]s|nunca|sin|no|nada)(\s+\1)+", r"\1", text, flags=re.I)
-        p1 = re.compile(r"(?P<neg>((\s+|\b|^)no))(?P<sk_words>(\s+(" +
-                        self.skip_words + "|" + tags + r"))*)\s+(?P<text>(?!(" +
-                        tags + ")(\s+|\b|$)))", flags=re.I)
-        m = p1.search(text)
-        if m:
-            text = p1.sub(r"\g<sk_words> \g<neg>_\g<text>", text)
+        text = _ES_REPEATED.sub(r"\1", text)
+        text = p1.sub(r"\g<sk_words> \g<neg>_\g<text>", text)
         # removes isolated marks "no_" if marks appear because of negation rules
-        text = re.sub(r"\b(no_)\b", r" no ", text, flags=re.I)
+        text = _ISOLATED_NO.sub(r" no ", text)
         # removes extra spaces because of transformations
-        text = re.sub(r"\s+", r" ", text, flags=re.I)
+        text = _SPACES.sub(r" ", text)
         return text.replace(' ', '~')
 
     def english_negation(self, text):
@@ -229,101 +467,91 @@ class LangDependency():
         markers used: "not, no, never, nor, neither" "any" is only used with negative sentences.
         """
 
-        if getattr(self, 'skip_words', None) is None:
-            self.skip_words = "me|you|he|she|it|us|the"
-            self.skip_words = self.skip_words + "|" + "|".join(self.neg_stopwords)
-
+        p1 = self.negation_pattern
         text = text.replace('~', ' ')
-        tags = _sURL_TAG + "|" + _sUSER_TAG + "|" + _sENTITY_TAG + "|" + \
-            _sHASH_TAG + "|" + \
-            _sNUM_TAG + "|" + _sNEGATIVE + "|" + \
-            _sPOSITIVE + "|" + _sNEUTRAL + "|"
-
         # expands contractions of negation
-        text = re.sub(r"\b(ca)n't\b", r"\1n not ", text, flags=re.I)
-        text = re.sub(r"\b(w)on't\b", r"\1ill not ", text, flags=re.I)
-        text = re.sub(r"\b(sha)n't\b", r"\1ll not ", text, flags=re.I)
-        text = re.sub(r"\b(can)not\b", r"\1 not ", text, flags=re.I)
-        text = re.sub(r"\b([a-z]+)(n't)\b", r"\1 not ", text, flags=re.I)
-
+        text = _EN_CONTRACTIONS.sub(_expand_contraction, text)
         # checks negative sentences with the "any" marker and changes "any" to "not" makers
-        pp1 = re.compile(r"(?P<neg>(\bnot\b))(?P<text>(\s+([^\s]+?)\s+)+?)(?P<any>any\b)", flags=re.I)
-        m = pp1.search(text)
-        if m:
-            text = pp1.sub(r"\g<neg> \g<text> not ", text)
-
+        text = _EN_ANY.sub(r"\g<neg> \g<text> not ", text)
         # unifies negation markers under the "not" marker
         # markers used:
         #              not, no, never, nor, neither
-        text = re.sub(r"\b(not|no|never|nor|neither)\b", r" not ", text, flags=re.I)
-        text = re.sub(r"\s+", r" ", text, flags=re.I)
-
-        p1 = re.compile(r"(?P<neg>((\s+|\b|^)not))(?P<sk_words>(\s+(" +
-                        self.skip_words + "|" + tags + r"))*)\s+(?P<text>(?!(" +
-                        tags + ")(\s+|\b|$)))", flags=re.I)
-        m = p1.search(text)
-        if m:
-            text = p1.sub(r"\g<sk_words> \g<neg>_\g<text>", text)
+        text = _EN_MARKERS.sub(r" not ", text)
+        text = _SPACES.sub(r" ", text)
+        text = p1.sub(r"\g<sk_words> \g<neg>_\g<text>", text)
         # removes isolated marks "no_" if marks appear because of negation rules
-        text = re.sub(r"\b(not_)\b", r" not ", text, flags=re.I)
-        text = re.sub(r"\s+", r" ", text, flags=re.I)
+        text = _ISOLATED_NOT.sub(r" not ", text)
+        text = _SPACES.sub(r" ", text)
         return text.replace(' ', '~')
 
     def italian_negation(self, text):
-        if getattr(self, 'skip_words', None) is None:
-            self.skip_words = "mi|ti|lo|gli|le|ne|li|glieli|glielo|gliela|gliene|gliele"
-            self.skip_words = self.skip_words + "|" + "|".join(self.neg_stopwords)
-
+        p1 = self.negation_pattern
         text = text.replace('~', ' ')
-        tags = _sURL_TAG + "|" + _sUSER_TAG + "|" + _sENTITY_TAG + "|" + \
-               _sHASH_TAG + "|" + \
-               _sNUM_TAG + "|" + _sNEGATIVE + "|" + \
-               _sPOSITIVE + "|" + _sNEUTRAL + "|"
-
         # unifies negation markers under the "no" marker
-        text = re.sub(r"\b(mai|senza|non|no|né|ne)\b", " no ", text, flags=re.I)
-
+        text = _IT_MARKERS.sub(" no ", text)
         # reduces to unique negation marker
-        text = re.sub(r"\b(mai|senza|non|no|né|ne)(\s+\1)+", r"\1", text, flags=re.I)
-
-        p1 = re.compile(r"(?P<neg>((\s+|\b|^)no))(?P<sk_words>(\s+(" +
-                        self.skip_words + "|" + tags + r"))*)\s+(?P<text>(?!(" +
-                        tags + ")(\s+|\b|$)))", flags=re.I)
-
-        m = p1.search(text)
-
-        if m:
-            text = p1.sub(r"\g<sk_words> \g<neg>_\g<text>", text)
+        text = _IT_REPEATED.sub(r"\1", text)
+        text = p1.sub(r"\g<sk_words> \g<neg>_\g<text>", text)
         # removes isolated marks "no_" if marks appear because of negation rules
-        text = re.sub(r"\b(no_)\b", r" no ", text, flags=re.I)
+        text = _ISOLATED_NO.sub(r" no ", text)
         # removes extra spaces because of transformations
-        text = re.sub(r"\s+", r" ", text, flags=re.I)
+        text = _SPACES.sub(r" ", text)
         return text.replace(' ', '~')
 
     def filterStopWords(self, text, stopwords_option):
         if stopwords_option == OPTION_NONE:
             return text
-        sw = self.stopwords
-        d = text.split('~')
-        R = []
-        for x in d:
-            try:
-                if x in sw[len(x)]:
-                    if stopwords_option == 'delete':
-                        continue
-                    elif stopwords_option == 'group':
-                        x = "_sw"
-            except KeyError:
-                pass
-            R.append(x)
-        return "~".join(R)
+        return "~".join(self.process_tokens(text.split('~'), stopwords=stopwords_option))
 
     def transform(self, text, negation=False, stemming=False, stopwords=OPTION_NONE):
+        """Negation, stemming and stopwords. The negation works on the
+        text; the stemming and the stopwords are applied on the same list
+        of tokens (:py:func:`process_tokens`)
+
+        >>> from b4msa.lang_dependency import LangDependency
+        >>> lang = LangDependency('spanish')
+        >>> lang.transform('~los~carros~no~son~veloces~', negation=True, stemming=True, stopwords='delete')
+        '~carr~no_son~veloc~'
+        """
         if negation:
             text = self.negation(text)
-
         if stemming:
-            text = self.stemming(text)
-
-        text = self.filterStopWords(text, stopwords)
-        return text
+            tokens = text.strip().split('~')
+        elif stopwords == OPTION_NONE:
+            return text
+        else:
+            tokens = text.split('~')
+        return "~".join(self.process_tokens(tokens, stemming=stemming, stopwords=stopwords))
+
+    def transform_many(self, texts, negation=False, stemming=False, stopwords=OPTION_NONE):
+        """:py:func:`transform` of a list of texts; each distinct token of
+        the batch is stemmed and searched in the stopwords once
+
+        :param texts: Texts
+        :type texts: list
+        :rtype: list
+
+        >>> from b4msa.lang_dependency import LangDependency
+        >>> lang = LangDependency('spanish')
+        >>> lang.transform_many(['~los~carros~', '~mis~carros~'], stemming=True, stopwords='group')
+        ['~_sw~carr~', '~_sw~carr~']
+        """
+        if negation:
+            texts = [self.negation(x) for x in texts]
+        if stemming:
+            docs = [x.strip().split('~') for x in texts]
+        elif stopwords == OPTION_NONE:
+            return list(texts)
+        else:
+            docs = [x.split('~') for x in texts]
+        unique = list({tok for tokens in docs for tok in tokens})
+        output = self.process_tokens(unique, stemming=stemming) if stemming else unique
+        if stopwords == OPTION_DELETE or stopwords == OPTION_GROUP:
+            sw = self.stopword_set
+            replace = None if stopwords == OPTION_DELETE else "_sw"
+            output = [replace if tok in sw else tok for tok in output]
+        mapping = dict(zip(unique, output))
+        if stopwords == OPTION_DELETE:
+            return ["~".join([tok for tok in map(mapping.__getitem__, tokens) if tok is not None])
+                    for tokens in docs]
+        return ["~".join(map(mapping.__getitem__, tokens)) for tokens in docs]
@@ -3,9 +3,6 @@
 
 import numpy as np
 from time import time
-from sklearn.metrics import f1_score, accuracy_score, recall_score, precision_score
-from sklearn import preprocessing
-from sklearn.model_selection import StratifiedKFold
 
 try:
     from tqdm import tqdm
@@ -166,7 +163,9 @@ class ParameterSelection:
 
 
 class Wrapper(object):
-    def __init__(self, X, y, score, n_folds, cls, seed=0, pool=None):
+    def __init__(self, X, y, score, n_folds, cls, seed=0, pool=None, tmpdir=None):
+        from sklearn import preprocessing
+        from sklearn.model_selection import StratifiedKFold
         self.n_folds = n_folds
         self.score = score
         self.X = X
@@ -174,6 +173,7 @@ class Wrapper(object):
         self.y = np.array(le.transform(y))
         self.cls = cls
         self.pool = pool
+        self.tmpdir = tmpdir
         np.random.seed(seed)
         self.kfolds = [x for x in StratifiedKFold(n_splits=n_folds, shuffle=True,
                                                   random_state=seed).split(np.zeros(self.y.shape[0]),
@@ -186,12 +186,14 @@ class Wrapper(object):
                                     textModel_params=conf,
                                     kfolds=self.kfolds,
                                     pool=self.pool,
-                                    use_tqdm=False)
+                                    use_tqdm=False,
+                                    tmpdir=self.tmpdir)
         self.compute_score(conf, hy)
         conf['_time'] = (time() - st) / self.n_folds
         return conf
 
     def compute_score(self, conf, hy):
+        from sklearn.metrics import f1_score, accuracy_score, recall_score, precision_score
         RS = recall_score(self.y, hy, average=None)
         conf['_all_f1'] = M = {str(self.le.inverse_transform([klass])[0]): f1 for klass, f1 in enumerate(f1_score(self.y, hy, average=None))}
         conf['_all_recall'] = {str(self.le.inverse_transform([klass])[0]): f1 for klass, f1 in enumerate(RS)}
@@ -216,6 +218,21 @@ class Wrapper(object):
         conf['_score'] = conf['_' + self.score]
 
 
+_WORKER_WRAPPER = None
+
+
+def _init_wrapper(wrapper):
+    """Store the :py:class:`Wrapper` used by the tasks sent to the worker,
+    so each task carries only a configuration"""
+    global _WORKER_WRAPPER
+    _WORKER_WRAPPER = wrapper
+
+
+def _wrapper_f(conf_code):
+    """Score a configuration in a worker, see :py:func:`Wrapper.f`"""
+    return _WORKER_WRAPPER.f(conf_code)
+
+
 def get_filename(kwargs, basename=None):
     L = []
     if basename:
@@ -67,4 +67,177 @@ def test_kfold_pool():
     for x in hy:
         assert x in ['POS', 'NEU', 'NEG']
     pool.close()
-    
+
+
+def test_kfold_corpus():
+    import os
+    import tempfile
+    import numpy as np
+    from b4msa.classifier import SVC
+    from microtc.utils import read_data_labels
+    from sklearn.model_selection import StratifiedKFold
+    from multiprocessing import Pool
+    fname = os.path.dirname(__file__) + '/text.json'
+    X, y = read_data_labels(fname)
+    X = X * 3
+    y = np.array(y * 3)
+    params = dict(lang='spanish', stemming=True, token_list=[-1, 3])
+    kfolds = list(StratifiedKFold(n_splits=3, shuffle=True, random_state=0).split(X, y))
+    hy = SVC.predict_kfold(X, y, kfolds=kfolds, textModel_params=params, use_tqdm=False)
+    for tr, ts in kfolds:
+        _, _hy = SVC.train_predict_pool((X, y, tr, ts, params))
+        assert np.all(hy[ts] == _hy)
+    D = [dict(text=text, klass=klass) for text, klass in zip(X, y)]
+    params = dict(weighting='entropy', unit_vector=False)
+    hy = SVC.predict_kfold(D, y, kfolds=kfolds, textModel_params=params, use_tqdm=False)
+    for tr, ts in kfolds:
+        _, _hy = SVC.train_predict_pool((D, y, tr, ts, params))
+        assert np.all(hy[ts] == _hy)
+    with Pool(2) as pool, tempfile.TemporaryDirectory() as path:
+        _hy = SVC.predict_kfold(D, y, kfolds=kfolds, textModel_params=params,
+                                pool=pool, use_tqdm=False, tmpdir=path)
+        assert os.listdir(path) == []
+        assert np.all(hy == _hy)
+        params = dict(n_features=2**10)
+        hy = SVC.predict_kfold(X, y, kfolds=kfolds, textModel_params=params, use_tqdm=False)
+        _hy = SVC.predict_kfold(X, y, kfolds=kfolds, textModel_params=params,
+                                pool=pool, use_tqdm=False, tmpdir=path)
+        assert np.all(hy == _hy)
+
+
+def test_SVC_fit_from_file():
+    from b4msa.classifier import SVC
+    from b4msa.textmodel import TextModel
+    from microtc.utils import tweet_iterator
+    import numpy as np
+    import os
+    fname = os.path.dirname(__file__) + '/text.json'
+    D = list(tweet_iterator(fname))
+    t = TextModel(D)
+    c = SVC(t).fit([t[x] for x in D], [x['klass'] for x in D])
+    c2 = SVC.fit_from_file(fname, chunksize=4)
+    assert c2.model.model.word2id == t.model.word2id
+    X = [t[x] for x in D]
+    assert np.all(c.predict(X) == c2.predict(X))
+
+
+def test_SVC_partial_fit():
+    from b4msa.classifier import SVC
+    from b4msa.textmodel import TextModel
+    from microtc.utils import tweet_iterator
+    import os
+    fname = os.path.dirname(__file__) + '/text.json'
+    D = list(tweet_iterator(fname))
+    y = [x['klass'] for x in D]
+    t = TextModel(D[::2])
+    c = SVC(t).fit([t[x] for x in D[::2]], y[::2])
+    t.partial_fit(D[1::2])
+    c.partial_fit([t[x] for x in D[1::2]], y[1::2])
+    assert c.svc.coef_.shape[1] == t.num_terms
+    for x in c.predict([t[x] for x in D]):
+        assert x in ['POS', 'NEU', 'NEG']
+    t = TextModel().partial_fit(D[:5])
+    c = SVC(t).partial_fit([t[x] for x in D[:5]], y[:5], classes=['POS', 'NEU', 'NEG'])
+    for _ in range(3):
+        c.partial_fit([t[x] for x in D[5:]], y[5:])
+    assert c.predict_text(D[0]['text']) in ['POS', 'NEU', 'NEG']
+
+
+def test_SVC_csr():
+    from b4msa.classifier import SVC
+    from b4msa.textmodel import TextModel
+    from microtc.utils import read_data_labels
+    import numpy as np
+    import os
+    fname = os.path.dirname(__file__) + '/text.json'
+    X, y = read_data_labels(fname)
+    t = TextModel(X)
+    Xt = t.transform(X)
+    c = SVC(t, random_state=0).fit(Xt, y)
+    c2 = SVC(t, random_state=0).fit([t[x] for x in X], y)
+    assert np.all(c.predict(Xt) == c2.predict([t[x] for x in X]))
+    assert np.all(c.decision_function(Xt) == c2.decision_function([t[x] for x in X]))
+
+
+def test_SVC_tonp():
+    from b4msa.classifier import SVC
+    from b4msa.textmodel import TextModel
+    from microtc.utils import read_data_labels
+    import numpy as np
+    import os
+    fname = os.path.dirname(__file__) + '/text.json'
+    X, y = read_data_labels(fname)
+    t = TextModel(X)
+    V = [t[x] for x in X]
+    c = SVC(t, random_state=0).fit(V, y)
+    M = c.tonp(V + [[(1, np.inf), (t.num_terms, 1.0)], []])
+    assert M.shape == (len(X) + 2, t.num_terms) and M[-2:].nnz == 0
+    for r, x in enumerate(V):
+        assert dict(x) == {k: v for k, v in zip(M[r].indices, M[r].data)}
+    c32 = SVC(t, dtype=np.float32, random_state=0).fit(V, y)
+    assert c32.tonp(V).dtype == np.float32
+    assert c32.tonp(t.transform(X)).dtype == np.float32
+    assert np.all(c.predict(V) == c32.predict(V))
+
+
+def test_SVC_predict_iter():
+    from b4msa.classifier import SVC
+    from b4msa.textmodel import TextModel
+    from microtc.utils import read_data_labels
+    import numpy as np
+    import os
+    fname = os.path.dirname(__file__) + '/text.json'
+    X, y = read_data_labels(fname)
+    t = TextModel(X)
+    c = SVC(t, random_state=0).fit(t.transform(X), y)
+    hy = c.predict_iter(iter(X), chunksize=4)
+    assert not isinstance(hy, list)
+    assert list(hy) == [c.predict_text(x) for x in X]
+    df = np.array(list(c.predict_iter(X, chunksize=2, decision_function=True)))
+    assert np.all(df == c.decision_function(t.transform(X)))
+    assert c.predict_file(fname, chunksize=3) == [c.predict_text(x) for x in X]
+    assert c.predict_file(fname, maxitems=5) == [c.predict_text(x) for x in X[:5]]
+
+
+def test_SVC_compile():
+    from b4msa.classifier import SVC
+    from b4msa.textmodel import TextModel
+    from microtc.utils import read_data_labels
+    import numpy as np
+    import pickle
+    import os
+    fname = os.path.dirname(__file__) + '/text.json'
+    X, y = read_data_labels(fname)
+    Z = X + ['', 'palabras fuera del vocabulario']
+    for labels in [y, [x == 'POS' for x in y]]:
+        t = TextModel(X, lang='spanish', stemming=True)
+        c = SVC(t, random_state=0).fit(t.transform(X), labels)
+        scorer = pickle.loads(pickle.dumps(c.compile()))
+        assert np.all(scorer.predict(Z) == c.predict(t.transform(Z)))
+        assert [scorer.predict_text(x) for x in Z] == list(c.predict(t.transform(Z)))
+        assert np.allclose(scorer.decision_function(Z), c.decision_function(t.transform(Z)))
+
+
+def test_SVC_quantize():
+    from b4msa.classifier import SVC
+    from b4msa.textmodel import TextModel
+    from microtc.utils import read_data_labels
+    import numpy as np
+    import pickle
+    import os
+    fname = os.path.dirname(__file__) + '/text.json'
+    X, y = read_data_labels(fname)
+    for labels in [y, [x == 'POS' for x in y]]:
+        t = TextModel(X)
+        Xt = t.transform(X)
+        c = SVC(t, random_state=0).fit(Xt, labels)
+        hy = c.predict(Xt)
+        coef = c.svc.coef_
+        for dtype in [np.int8, np.float16]:
+            q = pickle.loads(pickle.dumps(c)).quantize(dtype)
+            assert q.svc.coef_q.dtype == dtype
+            assert np.all(q.predict(Xt) == hy)
+            assert np.all(q.compile().predict(X) == hy)
+            assert np.abs(q.svc.coef_ - coef).max() <= np.abs(coef).max() / 254 + 1e-12
+            df = q.decision_function(Xt)
+            assert df.shape == c.decision_function(Xt).shape
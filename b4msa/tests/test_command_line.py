@@ -316,3 +316,89 @@ def test_train_kw():
     os.unlink(output)
     # os.unlink(c.get_output())
     
+
+
+def test_train_vocabulary():
+    from b4msa.command_line import CommandLineTrain, test
+    from b4msa.vocabulary import Vocabulary
+    from microtc.utils import load_model
+    import os
+    import sys
+    import tempfile
+    fname = os.path.dirname(__file__) + '/text.json'
+    with tempfile.TemporaryDirectory() as path:
+        output = os.path.join(path, 'model')
+        voc = os.path.join(path, 'voc')
+        predict = os.path.join(path, 'predict')
+        c = CommandLineTrain()
+        sys.argv = ['b4msa', '--vocabulary', voc, '-o', output, fname]
+        c.main()
+        svc = load_model(output)
+        assert isinstance(svc.model.model.word2id, Vocabulary)
+        del svc
+        sys.argv = ['b4msa', '-m', output, fname, '-o', predict]
+        test()
+
+
+def test_train_update():
+    from b4msa.command_line import CommandLineTrain
+    from microtc.utils import load_model
+    import os
+    import sys
+    import tempfile
+    fname = os.path.dirname(__file__) + '/text.json'
+    with tempfile.TemporaryDirectory() as path:
+        output = os.path.join(path, 'model')
+        output2 = os.path.join(path, 'model2')
+        c = CommandLineTrain()
+        sys.argv = ['b4msa', '-o', output, fname]
+        c.main()
+        c = CommandLineTrain()
+        sys.argv = ['b4msa', '--update', output, '-o', output2, fname]
+        c.main()
+        svc = load_model(output2)
+        assert svc.predict_text('buenos dias') in ['POS', 'NEU', 'NEG']
+
+
+def test_train_quantize():
+    from b4msa.command_line import CommandLineTrain, test
+    from b4msa.classifier import QuantizedLinearSVC
+    from microtc.utils import load_model, read_data_labels
+    import os
+    import sys
+    import tempfile
+    fname = os.path.dirname(__file__) + '/text.json'
+    with tempfile.TemporaryDirectory() as path:
+        output = os.path.join(path, 'model')
+        output2 = os.path.join(path, 'predict')
+        c = CommandLineTrain()
+        sys.argv = ['b4msa', '--quantize', 'int8', '-o', output, fname]
+        c.main()
+        svc = load_model(output)
+        assert isinstance(svc.svc, QuantizedLinearSVC)
+        sys.argv = ['b4msa', '-m', output, fname, '-o', output2]
+        test()
+        X, y = read_data_labels(output2)
+        assert len(y) == len(X) and set(y) <= {'POS', 'NEU', 'NEG'}
+
+
+def test_lazy_imports():
+    """The entry points start without importing sklearn, nltk, or multiprocessing"""
+    import subprocess
+    import sys
+    import os
+    import b4msa
+    code = """import sys
+sys.argv = ['b4msa', '--version']
+from b4msa import command_line
+try:
+    command_line.{0}()
+except SystemExit:
+    pass
+heavy = [x for x in ['sklearn', 'nltk', 'multiprocessing'] if x in sys.modules]
+assert len(heavy) == 0, heavy
+"""
+    cwd = os.path.dirname(os.path.dirname(b4msa.__file__))
+    for func in ['params', 'train', 'test', 'textmodel', 'kfolds']:
+        subprocess.check_call([sys.executable, '-c', code.format(func)], cwd=cwd,
+                              stdout=subprocess.DEVNULL)
@@ -0,0 +1,47 @@
+# Copyright 2016 Mario Graff (https://github.com/mgraffg)
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+def test_shared_corpus():
+    from b4msa.corpus import SharedCorpus
+    from b4msa.textmodel import TextModel
+    from microtc.utils import tweet_iterator
+    import numpy as np
+    import tempfile
+    import pickle
+    import os
+    fname = os.path.dirname(__file__) + '/text.json'
+    tw = list(tweet_iterator(fname))
+    klass = np.unique([x['klass'] for x in tw], return_inverse=True)[1]
+    corpus = SharedCorpus(TextModel().tokenize_corpus(tw), klass=klass)
+    shared = corpus.save(tempfile.mkdtemp())
+    assert corpus._counts is None and shared._counts is None
+    assert (shared.counts != TextModel.corpus_counts(corpus.corpus)).nnz == 0
+    corpus.counts
+    shared = corpus.save(tempfile.mkdtemp())
+    assert isinstance(shared.corpus[2], np.memmap)
+    assert not shared.counts.indices.flags.owndata and not shared.counts.data.flags.owndata
+    size = len(pickle.dumps(shared))
+    assert size < 300 and size < len(pickle.dumps(corpus))
+    shared = pickle.loads(pickle.dumps(shared))
+    assert pickle.loads(pickle.dumps(shared)).corpus[0] is shared.corpus[0]
+    assert shared.corpus[0] == corpus.corpus[0]
+    assert (shared.corpus[2] == corpus.corpus[2]).all()
+    assert (shared.counts != corpus.counts).nnz == 0
+    assert (shared.klass == klass).all()
+    rows = [0, 2, 4, 6]
+    text = TextModel().fit_corpus(shared.corpus, rows, counts=shared.counts)
+    X = text.transform_corpus(shared.corpus, [1, 3])
+    text = TextModel([tw[x] for x in rows])
+    assert (X != text.transform([tw[1], tw[3]])).nnz == 0
@@ -98,3 +98,116 @@ def test_get_lang():
     from b4msa.lang_dependency import get_lang
 
     assert get_lang('zh') == 'chinese'
+
+
+def test_english_negation():
+    """English Negation"""
+
+    from b4msa.lang_dependency import LangDependency
+    c = LangDependency(lang='english')
+    r = c.negation("I can't see any tweet~she WON'T go")
+    assert r.split('~') == 'I can not_see not_tweet she Will not_go'.split()
+    assert c.negation_pattern is c.negation_pattern
+    assert c.negation_pattern is not LangDependency(lang='spanish').negation_pattern
+
+
+def test_stopwords_shared():
+    """Stopword index shared and read-only"""
+
+    from b4msa.lang_dependency import LangDependency
+    import pickle
+    c = LangDependency(lang='spanish')
+    c2 = LangDependency(lang='es')
+    assert c.stopwords is c2.stopwords
+    assert c.stopword_set is c2.stopword_set
+    assert 'como' in c.stopwords[4] and 'como' in c.stopword_set
+    try:
+        c.stopwords[4] = frozenset()
+    except TypeError:
+        pass
+    else:
+        assert False
+    c = pickle.loads(pickle.dumps(c))
+    assert c.stopwords is c2.stopwords
+    assert c.filterStopWords('~como~esta~mi~carro~', 'delete') == '~carro~'
+
+
+def test_resource_pack():
+    """Resource pack equal to the text files"""
+
+    from b4msa.lang_dependency import LangDependency, PATH
+    from b4msa.lang_dependency import resource_pack, build_resource_pack
+    import os
+    import pickle
+    import tempfile
+    pack = resource_pack()
+    fname = os.path.join(tempfile.mkdtemp(), 'lang.pack')
+    build_resource_pack(fname)
+    with open(fname, 'rb') as fpt:
+        assert pickle.load(fpt) == pack
+    for lang in ['spanish', 'english', 'italian', 'arabic']:
+        c = LangDependency(lang)
+        words = c.load_stopwords(os.path.join(PATH, lang + '.stopwords'))
+        assert pack[lang]['stopword_set'] == set(words)
+        assert c.stopword_set == set(words)
+        for k, v in c.stopwords.items():
+            assert v == {x for x in words if len(x) == k}
+    for lang in ['spanish', 'english', 'italian']:
+        c = LangDependency(lang)
+        words = c.load_stopwords(os.path.join(PATH, lang + '.neg.stopwords'))
+        assert c.neg_stopwords == words
+        c.negation_pattern
+        assert c.skip_words.split('|')[-len(words):] == words
+
+
+def test_get_lang_dependency():
+    """One LangDependency per language shared by threads and pickles"""
+
+    from b4msa.lang_dependency import get_lang_dependency
+    from b4msa.textmodel import TextModel
+    from concurrent.futures import ThreadPoolExecutor
+    import pickle
+    with ThreadPoolExecutor(4) as pool:
+        shared = list(pool.map(get_lang_dependency, ['es', 'spanish'] * 8))
+        stems = list(pool.map(lambda x: get_lang_dependency('es').stemming(x),
+                              ['~los~carros~%d~' % i for i in range(100)]))
+    assert all(x is shared[0] for x in shared)
+    assert stems == ['~los~carr~%d~' % i for i in range(100)]
+    assert pickle.loads(pickle.dumps(shared[0])) is shared[0]
+    tm = TextModel(lang='es', stemming=True)
+    assert tm.lang is shared[0]
+    assert pickle.loads(pickle.dumps(tm)).lang is shared[0]
+
+
+def test_stem_cache():
+    """Stemming memo shared, bounded and persistent"""
+
+    from b4msa.lang_dependency import LangDependency
+    import tempfile
+    import os
+    c = LangDependency(lang='spanish')
+    cache = c.stem_cache
+    assert cache is LangDependency(lang='es').stem_cache
+    assert cache is not LangDependency(lang='english').stem_cache
+    cache.clear()
+    assert c.stemming('~los~carros~@carros~_url~~') == '~los~carr~@carros~_url~~'
+    assert c.stemming('los~carros') == 'los~carr'
+    assert cache.hits == 4 and cache.misses == 3
+    fname = os.path.join(tempfile.mkdtemp(), 'stem')
+    LangDependency.save_stem_cache(fname)
+    cache.clear()
+    LangDependency.load_stem_cache(fname)
+    assert cache.get('carros') == 'carr' and cache.get('') == ''
+    os.unlink(fname)
+
+
+def test_transform_many():
+    """Batch transform"""
+
+    from b4msa.lang_dependency import LangDependency
+    c = LangDependency(lang='spanish')
+    texts = ['~los~carros~no~son~veloces~', '~como~esta~mi~carro~', '~', '']
+    for kw in [dict(), dict(negation=True), dict(stemming=True, stopwords='delete'),
+               dict(negation=True, stemming=True, stopwords='group'),
+               dict(stopwords='delete')]:
+        assert c.transform_many(texts, **kw) == [c.transform(x, **kw) for x in texts]
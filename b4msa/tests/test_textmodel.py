@@ -215,3 +215,367 @@ def test_textmodel_get_word_list():
                      ['聊聊', '呗']):
         assert y == hy
     
+
+
+def test_textmodel_transform_n_jobs():
+    from b4msa.textmodel import TextModel
+    from microtc.utils import tweet_iterator
+    import os
+    fname = os.path.dirname(__file__) + '/text.json'
+    tw = list(tweet_iterator(fname))
+    text = TextModel(tw, lang='spanish')
+    X = text.transform(tw)
+    for chunksize in [None, 1, 3]:
+        Xp = text.transform(tw, n_jobs=2, chunksize=chunksize)
+        assert Xp.shape == X.shape
+        assert (Xp != X).nnz == 0
+
+
+def test_textmodel_transform_unique():
+    from b4msa.textmodel import TextModel
+    from microtc.utils import tweet_iterator
+    import os
+    fname = os.path.dirname(__file__) + '/text.json'
+    tw = list(tweet_iterator(fname))
+    text = TextModel(tw)
+    D = tw + [dict(x) for x in tw[::-1]] + tw[:3]
+    X = text.transform(D)
+    Xu = text.transform(D, unique=True)
+    assert Xu.shape == X.shape
+    assert (Xu != X).nnz == 0
+
+
+def test_textmodel_cache():
+    from b4msa.textmodel import TextModel
+    from microtc.utils import tweet_iterator
+    import pickle
+    import os
+    fname = os.path.dirname(__file__) + '/text.json'
+    tw = [x['text'] for x in tweet_iterator(fname)]
+    text = TextModel(tw)
+    assert text.cache is None
+    text.cache_size = 4
+    for _ in range(2):
+        for x in tw[:4]:
+            assert text[x] == TextModel.__bases__[0].__getitem__(text, x)
+    assert text.cache.hits == 4 and text.cache.misses == 4
+    [text[x] for x in tw]
+    assert len(text.cache) == 4
+    text = pickle.loads(pickle.dumps(text))
+    assert text.cache_size == 4 and len(text.cache) == 0
+    text.fit(tw)
+    assert text.cache.misses == 0
+
+
+def test_textmodel_class_entropy():
+    from b4msa.textmodel import TextModel, class_histogram, class_entropy
+    from microtc.weighting import Entropy
+    from microtc.utils import tweet_iterator
+    import numpy as np
+    import os
+    fname = os.path.dirname(__file__) + '/text.json'
+    tw = list(tweet_iterator(fname))
+    text = TextModel(tw)
+    tokens = [text.tokenize(x) for x in tw]
+    w2id = text.model.word2id
+    w = class_entropy(class_histogram(tokens, tw, w2id))
+    assert np.all(w == Entropy.entropy(tokens, tw, w2id))
+
+
+def test_textmodel_fit_iter():
+    from b4msa.textmodel import TextModel
+    from microtc.utils import tweet_iterator
+    import os
+    fname = os.path.dirname(__file__) + '/text.json'
+    tw = list(tweet_iterator(fname))
+    for kw in [dict(), dict(threshold=0.01), dict(weighting='entropy'),
+               dict(token_min_filter=1, lang='spanish')]:
+        text = TextModel(tw, **kw)
+        for n_jobs in [1, 2]:
+            t = TextModel(**kw).fit_iter(tweet_iterator(fname), chunksize=3, n_jobs=n_jobs)
+            assert t.model.word2id == text.model.word2id
+            assert t.model.wordWeight == text.model.wordWeight
+            assert t[tw[0]] == text[tw[0]]
+    # the most common tokens are the same up to the order of the ties
+    text = TextModel(tw, max_dimension=True, token_max_filter=20)
+    for n_jobs in [1, 2]:
+        t = TextModel(max_dimension=True, token_max_filter=20).fit_iter(tweet_iterator(fname),
+                                                                        chunksize=3, n_jobs=n_jobs)
+        assert t.num_terms == text.num_terms
+        assert sorted(t.document_frequency) == sorted(text.document_frequency)
+
+
+def test_textmodel_n_features():
+    from b4msa.textmodel import TextModel
+    from b4msa.classifier import SVC
+    from microtc.utils import tweet_iterator
+    import numpy as np
+    import pickle
+    import os
+    fname = os.path.dirname(__file__) + '/text.json'
+    tw = list(tweet_iterator(fname))
+    text = TextModel(tw, lang='spanish', n_features=2**12)
+    assert not hasattr(text.model, '_w2id')
+    assert text.num_terms == 2**12
+    X = text.transform(tw)
+    assert X.shape == (len(tw), 2**12)
+    assert np.allclose(np.sqrt(X.multiply(X).sum(axis=1)), 1)
+    text2 = pickle.loads(pickle.dumps(text))
+    assert text2[tw[0]] == text[tw[0]]
+    t = TextModel(lang='spanish', n_features=2**12).fit_iter(tweet_iterator(fname), chunksize=2)
+    assert np.all(t.model.df == text.model.df)
+    text = TextModel(tw, n_features=2**12, threshold=0.01)
+    t = TextModel(n_features=2**12, threshold=0.01).fit_iter(tweet_iterator(fname), chunksize=2)
+    assert np.all(t.model.wordWeight == text.model.wordWeight)
+    svc = SVC(text).fit(text.transform(tw), [x['klass'] for x in tw])
+    assert svc.num_terms == 2**12
+    for x in svc.predict([text[x] for x in tw]):
+        assert x in ['POS', 'NEU', 'NEG']
+    for weighting in ['tf', 'entropy']:
+        try:
+            TextModel(n_features=2**10, weighting=weighting)
+            assert False
+        except ValueError:
+            pass
+
+
+def test_textmodel_partial_fit():
+    from b4msa.textmodel import TextModel
+    from microtc.utils import tweet_iterator
+    import numpy as np
+    import os
+    fname = os.path.dirname(__file__) + '/text.json'
+    tw = list(tweet_iterator(fname))
+    text = TextModel(tw)
+    inc = TextModel().partial_fit(tw[:4]).partial_fit(tw[4:])
+    w2id = inc.model.word2id
+    for k, v in text.model.word2id.items():
+        assert np.isclose(text.model.wordWeight[v], inc.model.wordWeight[w2id[k]])
+    text = TextModel(tw[:4])
+    ids = dict(text.model.word2id)
+    text.partial_fit(tw[4:])
+    for k, v in ids.items():
+        assert text.model.word2id[k] == v
+        assert text.document_frequency[v] == sum([k in text.tokenize(x) for x in tw])
+    text = TextModel(n_features=2**10).partial_fit(tw[:4]).partial_fit(tw[4:])
+    assert np.all(text.model.df == TextModel(tw, n_features=2**10).model.df)
+
+
+def test_textmodel_partial_fit_after_fit():
+    from b4msa.textmodel import TextModel
+    from microtc.utils import tweet_iterator
+    import numpy as np
+    import warnings
+    import os
+    fname = os.path.dirname(__file__) + '/text.json'
+    tw = list(tweet_iterator(fname))
+    text = TextModel(token_list=[-1])
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        text.partial_fit(tw[:3]).fit(tw[3:6]).partial_fit(tw[6:])
+    inc = TextModel(tw[3:6], token_list=[-1]).partial_fit(tw[6:])
+    assert text.model.word2id == inc.model.word2id
+    assert np.all(text.document_frequency == inc.document_frequency)
+    assert np.all(np.isfinite(list(text.model.wordWeight.values())))
+    D = [dict(text='buenos dias', klass='a'), dict(text='buenos dias', klass='b')]
+    text = TextModel(D, token_list=[-1], token_min_filter=2)
+    assert len(text.model.word2id) == 0
+    text.partial_fit(['buenos dias', 'buenos', 'buenos nuevo'])
+    assert list(text.model.word2id) == ['buenos']
+    text = TextModel(D, token_list=[-1], threshold=0.1)
+    try:
+        text.partial_fit(['nuevo'])
+        assert False
+    except ValueError:
+        pass
+    text.partial_fit(D + [dict(text='nuevo', klass='a')] * 6)
+    assert list(text.model.word2id) == ['nuevo']
+    assert not hasattr(text, '_rejected')
+    text = TextModel(D + [dict(text='x', klass='a')], token_list=[-1], n_features=64, threshold=0.1)
+    text.partial_fit(D)
+    assert np.all(text.model.wordWeight == 0) and np.all(text.model.df == 0)
+
+
+def _get_model(args):
+    from b4msa.textmodel import get_model
+    import os
+    cachedir, tw = args
+    get_model(None, tw, None, dict(lang='spanish'), cachedir=cachedir)
+    return os.listdir(cachedir)
+
+
+def test_get_model():
+    from b4msa.textmodel import get_model
+    from microtc.utils import tweet_iterator
+    from multiprocessing import Pool
+    import tempfile
+    import warnings
+    import shutil
+    import os
+    fname = os.path.dirname(__file__) + '/text.json'
+    tw = [x['text'] for x in tweet_iterator(fname)]
+    cachedir = tempfile.mkdtemp()
+    with Pool(2) as pool:
+        pool.map(_get_model, [(cachedir, tw)] * 4)
+    assert len(os.listdir(cachedir)) == 1
+    m = get_model(None, tw, None, dict(lang='spanish'), cachedir=cachedir)
+    assert m.model.word2id == get_model(None, tw, None, dict(lang='spanish'),
+                                        cachedir=cachedir).model.word2id
+    assert len(os.listdir(cachedir)) == 1
+    get_model(None, tw[1:], None, dict(lang='spanish'), cachedir=cachedir, max_entries=1)
+    assert len(os.listdir(cachedir)) == 1
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter('always')
+        get_model('text', tw[1:], None, dict(lang='spanish'), cachedir=cachedir)
+    assert w[0].category is DeprecationWarning
+    shutil.rmtree(cachedir)
+
+
+def test_file_lock():
+    from b4msa.utils import FileLock
+    import tempfile
+    import os
+    fname = os.path.join(tempfile.mkdtemp(), 'lock')
+    # a lock file left by a crashed process is not held by anyone
+    open(fname, 'w').close()
+    with FileLock(fname):
+        assert os.path.isfile(fname)
+    assert not os.path.isfile(fname)
+
+
+def test_vocabulary_tokenizer():
+    from b4msa.textmodel import TextModel
+    from microtc.utils import tweet_iterator
+    import pickle
+    import os
+    fname = os.path.join(os.path.dirname(__file__), 'text.json')
+    tw = list(tweet_iterator(fname))
+    for kw in [dict(), dict(lang='spanish'), dict(token_list=[3, -2, [2, 1], 5, 3]),
+               dict(weighting='tf'), dict(weighting='entropy'),
+               dict(unit_vector=False), dict(token_list=[7, 9])]:
+        text = TextModel(**kw).fit(tw)
+        texts = [x['text'] for x in tw] + ['', 'xyz', 'hola a todos ' * 3, tw[0]]
+        vecs = [text[x] for x in texts]
+        text.vocabulary_tokenizer = True
+        assert text.vocabulary_tokenizer
+        for x, vec in zip(texts, vecs):
+            assert text[x] == vec
+        text = pickle.loads(pickle.dumps(text))
+        assert text.vocabulary_tokenizer
+        for x, vec in zip(texts, vecs):
+            assert text[x] == vec
+    text = TextModel(n_features=2**10).fit(tw)
+    try:
+        text.vocabulary_tokenizer = True
+    except RuntimeError:
+        return
+    assert False
+
+
+def test_vocabulary_tokenizer_fit():
+    from b4msa.textmodel import TextModel
+    from microtc.utils import tweet_iterator
+    import os
+    fname = os.path.join(os.path.dirname(__file__), 'text.json')
+    tw = list(tweet_iterator(fname))
+    text = TextModel().fit(tw[:3])
+    text.vocabulary_tokenizer = True
+    _ = text[tw[5]]
+    text.fit(tw)
+    vec = text[tw[5]]
+    text.vocabulary_tokenizer = False
+    assert text[tw[5]] == vec
+
+
+def test_csr_arrays():
+    from b4msa.textmodel import TextModel
+    from microtc.utils import tweet_iterator
+    import numpy as np
+    import os
+    fname = os.path.join(os.path.dirname(__file__), 'text.json')
+    tw = list(tweet_iterator(fname))
+    texts = tw + [dict(text=''), 'xyz']
+    for kw in [dict(), dict(weighting='tf'), dict(weighting='entropy'),
+               dict(unit_vector=False), dict(n_features=2**10)]:
+        text = TextModel(**kw).fit(tw)
+        indptr, indices, data = text.csr_arrays(texts)
+        assert indptr.shape[0] == len(texts) + 1
+        X = text.transform(texts)
+        assert X.has_sorted_indices
+        Y = text.tonp([text[x] for x in texts])
+        assert X.shape == Y.shape
+        assert (X != Y).nnz == 0
+
+
+def test_tokenize_many():
+    from b4msa.textmodel import TextModel
+    from microtc.utils import tweet_iterator
+    import os
+    fname = os.path.join(os.path.dirname(__file__), 'text.json')
+    tw = list(tweet_iterator(fname))
+    texts = tw + ['', ['buenos dias', 'no es de los'], dict(text='nunca jamas')]
+    for kw in [dict(), dict(lang='spanish', negation=True, stemming=True, stopwords='delete'),
+               dict(lang='english', stemming=True, stopwords='group')]:
+        text = TextModel(**kw)
+        assert text.tokenize_many(texts) == [text.tokenize(x) for x in texts]
+
+
+def test_tokenize_many_subclass():
+    from b4msa.textmodel import TextModel
+    from microtc.utils import tweet_iterator
+    import os
+
+    class Day(TextModel):
+        def text_transformations(self, text):
+            text = super(Day, self).text_transformations(text)
+            return text.replace('dia', 'DAY')
+
+    fname = os.path.join(os.path.dirname(__file__), 'text.json')
+    tw = list(tweet_iterator(fname)) + ['buenos dias']
+    text = Day(tw, lang='spanish', token_list=[-1])
+    assert text.tokenize_many(tw) == [text.tokenize(x) for x in tw]
+    assert 'DAYs' in text.model.word2id and 'dias' not in text.model.word2id
+    assert len(text['buenos dias']) == 2
+
+
+def test_tokenize_corpus():
+    from b4msa.textmodel import TextModel
+    from microtc.utils import tweet_iterator
+    from multiprocessing import Pool
+    import os
+    fname = os.path.join(os.path.dirname(__file__), 'text.json')
+    tw = list(tweet_iterator(fname))
+    text = TextModel(lang='spanish', stemming=True)
+    tokens = text.tokenize_many(tw)
+    corpus = text.tokenize_corpus(tw)
+    assert TextModel.corpus_tokens(corpus, range(len(tw))) == tokens
+    with Pool(2) as pool:
+        corpus2 = text.tokenize_corpus(tw, pool=pool)
+    assert corpus2[0] == corpus[0]
+    assert (corpus2[1] == corpus[1]).all() and (corpus2[2] == corpus[2]).all()
+    text = TextModel(tw)
+    X = text.transform(tw)
+    Y = text.transform_tokens(text.tokenize_many(tw))
+    assert (X != Y).nnz == 0
+
+
+def test_fit_corpus():
+    from b4msa.textmodel import TextModel
+    from microtc.utils import tweet_iterator
+    import os
+    fname = os.path.join(os.path.dirname(__file__), 'text.json')
+    tw = list(tweet_iterator(fname)) * 2
+    tr, ts = list(range(0, 18, 2)), list(range(1, 18, 2))
+    for params in [dict(), dict(unit_vector=False), dict(weighting='entropy'), dict(threshold=0.01)]:
+        text = TextModel(**params)
+        corpus = text.tokenize_corpus(tw)
+        ids = corpus[2].copy()
+        counts = TextModel.corpus_counts(corpus)
+        assert counts.shape == (len(tw), len(corpus[0])) and counts.sum() == ids.shape[0]
+        assert (corpus[2] == ids).all()
+        text.fit_corpus(corpus, tr, X=tw, counts=counts)
+        text2 = TextModel([tw[x] for x in tr], **params)
+        assert text.model.word2id == text2.model.word2id
+        X = text.transform_corpus(corpus, ts)
+        Y = text2.transform([tw[x] for x in ts])
+        assert (X != Y).nnz == 0
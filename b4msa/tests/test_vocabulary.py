@@ -0,0 +1,84 @@
+# Copyright 2016 Mario Graff (https://github.com/mgraffg)
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+def test_vocabulary():
+    from b4msa.vocabulary import Vocabulary, save_vocabulary
+    from b4msa.textmodel import TextModel
+    from microtc.utils import tweet_iterator
+    import tempfile
+    import os
+    fname = os.path.dirname(__file__) + '/text.json'
+    tw = list(tweet_iterator(fname))
+    text = TextModel(tw, lang='spanish')
+    w2id = text.model.word2id
+    with tempfile.TemporaryDirectory() as path:
+        voc_fname = os.path.join(path, 'voc')
+        save_vocabulary(w2id, voc_fname)
+        voc = Vocabulary(voc_fname)
+        assert len(voc) == len(w2id)
+        assert dict(voc.items()) == w2id
+        assert sorted(voc) == list(voc)
+        for k, v in w2id.items():
+            assert voc[k] == v
+        for k in ['xxx', 'q:\ud800x', 1]:
+            assert k not in voc
+        del voc
+
+
+def test_textmodel_save_vocabulary():
+    from b4msa.vocabulary import Vocabulary
+    from b4msa.textmodel import TextModel
+    from microtc.utils import tweet_iterator
+    import pickle
+    import tempfile
+    import os
+    fname = os.path.dirname(__file__) + '/text.json'
+    tw = list(tweet_iterator(fname))
+    text = TextModel(tw, lang='spanish', threshold=0.01)
+    X = [text[x] for x in tw]
+    num_terms = text.num_terms
+    with tempfile.TemporaryDirectory() as path:
+        text.save_vocabulary(os.path.join(path, 'voc'))
+        assert isinstance(text.model.word2id, Vocabulary)
+        assert text.num_terms == num_terms
+        assert len(pickle.dumps(text.model.word2id)) < 200
+        text = pickle.loads(pickle.dumps(text))
+        assert [text[x] for x in tw] == X
+        del text
+
+
+def test_vocabulary_relocation():
+    from b4msa.vocabulary import load_model
+    from b4msa.textmodel import TextModel
+    from microtc.utils import tweet_iterator, save_model
+    import tempfile
+    import shutil
+    import os
+    fname = os.path.dirname(__file__) + '/text.json'
+    tw = list(tweet_iterator(fname))
+    text = TextModel(tw, lang='spanish')
+    X = [text[x] for x in tw]
+    with tempfile.TemporaryDirectory() as path:
+        src = os.path.join(path, 'src')
+        os.mkdir(src)
+        text.save_vocabulary(os.path.join(src, 'voc'))
+        save_model(text, os.path.join(src, 'model'))
+        del text
+        dst = os.path.join(path, 'dst')
+        shutil.move(src, dst)
+        text = load_model(os.path.join(dst, 'model'))
+        assert text.model.word2id.fname == os.path.join(dst, 'voc')
+        assert [text[x] for x in tw] == X
+        del text
@@ -12,14 +12,32 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import os
-from microtc.textmodel import TextModel as mTCTextModel
-from microtc.params import OPTION_NONE, get_filename, OPTION_DELETE
-from microtc.weighting import Entropy
-from microtc.utils import load_model, save_model
-from .lang_dependency import LangDependency
+import json
+import hashlib
+import tempfile
+import warnings
+import numpy as np
+from itertools import islice
+from microtc.textmodel import TextModel as mTCTextModel, WEIGHTING
+from microtc.params import OPTION_NONE, OPTION_DELETE
+from collections import Counter as DocCounter
+from microtc.weighting import KLASS, TFIDF, Entropy, TF
+from microtc.utils import load_model, save_model, get_class, Counter
+from .lang_dependency import get_lang_dependency
+from .utils import LRUCache, FileLock, chunk_iterator
+from .weighting import HashingTFIDF, HashingVocabulary, ids2weight, ids2csr, weight_array
+from .weighting import flat_ids2csr, filter_counter, unfitted_model
+from .tokenizer import VocabularyTokenizer
+from .vocabulary import Vocabulary, save_vocabulary
 import re
 
 
+def _collapse_separators(text):
+    """Replace the runs of the token separator (~) left by the language
+    dependent transformations with a single one"""
+    return re.sub('~+', '~', text)
+
+
 def get_word_list_zh(text):
     """Tokenize Chinese using jieba"""
     import jieba
@@ -28,6 +46,52 @@ def get_word_list_zh(text):
     return [x for x in _ if len(x)]
 
 
+def class_histogram(tokens, docs, word2id):
+    """Number of documents of each class containing each token
+
+    :param tokens: Tokens of each document
+    :type tokens: list
+    :param docs: Corpus, the class is in the `klass` key
+    :type docs: list
+    :param word2id: Map token to identifier
+    :type word2id: dict
+    :rtype: np.array (number of classes x number of tokens)
+    """
+
+    from scipy.sparse import csr_matrix
+    _, y = np.unique([x[KLASS] for x in docs], return_inverse=True)
+    row = []
+    col = []
+    for r, toks in enumerate(tokens):
+        ids = {word2id[t] for t in toks if t in word2id}
+        col.extend(ids)
+        row.extend([r] * len(ids))
+    presence = csr_matrix((np.ones(len(col)), (row, col)),
+                          shape=(len(tokens), len(word2id)))
+    klass = csr_matrix((np.ones(y.shape[0]), (y, np.arange(y.shape[0]))),
+                       shape=(_.shape[0], y.shape[0]))
+    return (klass @ presence).toarray()
+
+
+def class_entropy(hist):
+    """1 - entropy of each token computed from :py:func:`class_histogram`;
+    it matches :py:func:`microtc.weighting.Entropy.entropy`
+
+    :param hist: Number of documents per class and token
+    :type hist: np.array
+    :rtype: np.array
+    """
+
+    nklasses = hist.shape[0]
+    hist = hist + 3
+    hist = hist / hist.sum(axis=0)
+    logc = np.log2(hist)
+    logc[~np.isfinite(logc)] = 0
+    if nklasses > 2:
+        logc = logc / np.log2(nklasses)
+    return (1 + (hist * logc).sum(axis=0))
+
+
 class TextModel(mTCTextModel):
     """
 
@@ -43,6 +107,8 @@ class TextModel(mTCTextModel):
     :type stemming: bool
     :param stopwords: Stopwords (none | group | delete)
     :type stopwords: str
+    :param n_features: Map the tokens into `n_features` buckets (see :py:class:`b4msa.weighting.HashingTFIDF`) instead of keeping the vocabulary; it only supports the tfidf weighting (ValueError otherwise)
+    :type n_features: int
 
     Usage:
 
@@ -64,11 +130,14 @@ class TextModel(mTCTextModel):
     array([1, 0, 0])
     """
     def __init__(self, docs=None, threshold=0, lang=None, negation=False, stemming=False,
-                 stopwords=OPTION_NONE, **kwargs):
+                 stopwords=OPTION_NONE, n_features=None, **kwargs):
+        weighting = kwargs.get('weighting', 'tfidf')
+        if n_features and get_class(WEIGHTING.get(weighting, weighting)) is not TFIDF:
+            raise ValueError("n_features only supports the tfidf weighting, not {0}".format(weighting))
         default_parameters = dict(token_list=[-2, -1, 2, 3, 4])
         self._lang_kw = dict(negation=negation, stemming=stemming, stopwords=stopwords)
         if lang:
-            self.lang = LangDependency(lang)
+            self.lang = get_lang_dependency(lang)
             _ = self.default_parameters(lang=self.lang.lang)
             if _ is not None:
                 default_parameters = _
@@ -82,6 +151,7 @@ class TextModel(mTCTextModel):
         else:
             self.lang = False
         self._threshold = threshold
+        self.n_features = n_features
         default_parameters.update(kwargs)
         super(TextModel, self).__init__(docs, **default_parameters)
 
@@ -94,11 +164,772 @@ class TextModel(mTCTextModel):
         :rtype: instance
         """
 
-        super(TextModel, self).fit(X)
+        return self.fit_tokens(self.tokenize_many(X), X)
+
+    def tokenize_many(self, texts):
+        """Tokens of each text, i.e., :py:func:`tokenize` of each one; the
+        language dependent transformations are applied to the whole batch
+        (see :py:func:`b4msa.lang_dependency.LangDependency.transform_many`)
+
+        :param texts: Texts
+        :type texts: list
+        :rtype: list
+
+        >>> from b4msa.textmodel import TextModel
+        >>> textmodel = TextModel(lang='spanish', stemming=True, token_list=[-1])
+        >>> textmodel.tokenize_many(['los carros', 'el carro'])
+        [['los', 'carr'], ['el', 'carr']]
+        """
+        texts = [self.get_text(x) if isinstance(x, dict) else x for x in texts]
+        if not self.lang or not self._batch_tokenize:
+            return [self.tokenize(x) for x in texts]
+        # a list of texts is the concatenation of its tokens, see tokenize
+        single = [i for i, x in enumerate(texts) if not isinstance(x, (list, tuple))]
+        base = super(TextModel, self).text_transformations
+        norm = self.lang.transform_many([base(texts[i]) for i in single], **self._lang_kw)
+        output = [None] * len(texts)
+        for i, text in zip(single, norm):
+            output[i] = self._text_tokens(_collapse_separators(text))
+        for i, x in enumerate(texts):
+            if output[i] is None:
+                output[i] = self.tokenize(x)
+        return output
+
+    @property
+    def _batch_tokenize(self):
+        """Whether :py:func:`tokenize_many` can transform the texts as a batch,
+        i.e., the class does not override the methods used by :py:func:`tokenize`"""
+        cls = type(self)
+        return all(getattr(cls, x) is getattr(TextModel, x)
+                   for x in ['text_transformations', 'tokenize', '_tokenize'])
+
+    def tokenize_corpus(self, texts, pool=None):
+        """Tokenize `texts` once (see :py:func:`tokenize_many`) and keep the
+        tokens as identifiers of the vocabulary of the corpus, i.e., the
+        tokens of text `i` are the ones of ``ids[indptr[i]:indptr[i + 1]]``;
+        :py:func:`corpus_tokens` returns the tokens of any subset of the texts
+
+        :param texts: Texts
+        :type texts: list
+        :param pool: Tokenize consecutive chunks of `texts` in the processes of the pool
+        :type pool: :py:class:`multiprocessing.Pool`
+        :rtype: tuple - vocabulary, indptr, ids
+
+        >>> from b4msa.textmodel import TextModel
+        >>> textmodel = TextModel(token_list=[-1])
+        >>> corpus = textmodel.tokenize_corpus(['buenos dias', 'buenas noches', 'dias'])
+        >>> TextModel.corpus_tokens(corpus, [2, 0])
+        [['dias'], ['buenos', 'dias']]
+        """
+        from multiprocessing import cpu_count
+        texts = list(texts)
+        if pool is None:
+            chunks = [self._tokenize_chunk(texts)]
+        else:
+            size = max(1, len(texts) // (4 * cpu_count()))
+            chunks = pool.map(self._tokenize_chunk,
+                              [texts[i:i + size] for i in range(0, len(texts), size)])
+        # the identifiers of each chunk are mapped to the ones of the corpus
+        w2id = dict()
+        ids = []
+        lengths = []
+        for vocabulary, _lengths, _ids in chunks:
+            ident = np.fromiter((w2id.setdefault(x, len(w2id)) for x in vocabulary),
+                                dtype=np.int32, count=len(vocabulary))
+            ids.append(ident[_ids])
+            lengths.append(_lengths)
+        indptr = np.zeros(len(texts) + 1, dtype=np.int64)
+        if len(texts):
+            np.cumsum(np.concatenate(lengths), out=indptr[1:])
+        ids = np.concatenate(ids) if len(ids) else np.zeros(0, dtype=np.int32)
+        return list(w2id), indptr, ids
+
+    def _tokenize_chunk(self, texts):
+        w2id = dict()
+        tokens = self.tokenize_many(texts)
+        lengths = np.fromiter((len(x) for x in tokens), dtype=np.int64, count=len(tokens))
+        ids = np.fromiter((w2id.setdefault(t, len(w2id)) for x in tokens for t in x),
+                          dtype=np.int32, count=lengths.sum())
+        return list(w2id), lengths, ids
+
+    @staticmethod
+    def corpus_tokens(corpus, rows):
+        """Tokens of the texts `rows` of a corpus tokenized by :py:func:`tokenize_corpus`
+
+        :param corpus: Output of :py:func:`tokenize_corpus`
+        :type corpus: tuple
+        :param rows: Indexes of the texts
+        :type rows: list
+        :rtype: list
+        """
+        vocabulary, indptr, ids = corpus
+        return [[vocabulary[i] for i in ids[indptr[r]:indptr[r + 1]].tolist()] for r in rows]
+
+    @staticmethod
+    def corpus_counts(corpus):
+        """Number of times each token of the vocabulary of a corpus
+        tokenized by :py:func:`tokenize_corpus` appears in each text
+
+        :param corpus: Output of :py:func:`tokenize_corpus`
+        :type corpus: tuple
+        :rtype: csr_matrix (texts x vocabulary)
+        """
+        from scipy.sparse import csr_matrix
+        vocabulary, indptr, ids = corpus
+        # sum_duplicates sorts the indices in place, so the arrays of the corpus are copied
+        counts = csr_matrix((np.ones(ids.shape[0], dtype=np.int32), ids.copy(), indptr.copy()),
+                            shape=(indptr.shape[0] - 1, len(vocabulary)))
+        counts.sum_duplicates()
+        return counts
+
+    def _corpus_rows(self, corpus, rows):
+        """Position in `ids` of the tokens of the texts `rows` and their number per text"""
+        indptr = corpus[1]
+        rows = np.asarray(rows, dtype=np.int64)
+        start = indptr[rows]
+        lengths = indptr[rows + 1] - start
+        offset = np.zeros(rows.shape[0], dtype=np.int64)
+        np.cumsum(lengths[:-1], out=offset[1:])
+        return np.repeat(start - offset, lengths) + np.arange(lengths.sum()), lengths
+
+    @property
+    def _fits_counts(self):
+        """Whether :py:func:`fit_corpus` uses the count matrix; the buckets of
+        the hashing mode are computed from the tokens and the ties of
+        `max_dimension` depend on the order in which the tokens are counted"""
+        return not (self.n_features or self.max_dimension)
+
+    def fit_corpus(self, corpus, rows, X=None, counts=None, klass=None):
+        """Train the model with the texts `rows` of a corpus tokenized by
+        :py:func:`tokenize_corpus`; the document frequencies (overall and per
+        class) are column sums of the rows of the count matrix, so the model
+        is the one of ``fit_tokens(corpus_tokens(corpus, rows), X[rows])``
+        without visiting the tokens
+
+        :param corpus: Output of :py:func:`tokenize_corpus`
+        :type corpus: tuple
+        :param rows: Indexes of the texts
+        :type rows: list
+        :param X: Corpus, the class is used by the entropy and the threshold
+        :type X: list
+        :param counts: Output of :py:func:`corpus_counts`
+        :type counts: csr_matrix
+        :param klass: Class of each text, it replaces `X`
+        :type klass: np.array
+        :rtype: instance
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        labels = None
+        if self._per_klass:
+            if klass is None:
+                labels = np.array([X[r][KLASS] for r in rows.tolist()])
+            else:
+                labels = np.asarray(klass)[rows]
+        if not self._fits_counts:
+            docs = None if labels is None else [{KLASS: k} for k in labels.tolist()]
+            return self.fit_tokens(self.corpus_tokens(corpus, rows.tolist()), docs)
+        if counts is None:
+            counts = self.corpus_counts(corpus)
+        vocabulary = corpus[0]
+        counts = counts[rows]
+
+        def counter(matrix):
+            df = np.bincount(matrix.indices, minlength=len(vocabulary))
+            nz = np.flatnonzero(df)
+            return dict(zip(map(vocabulary.__getitem__, nz.tolist()), df[nz].tolist()))
+
+        per_klass = dict()
+        if labels is not None:
+            for label in np.unique(labels):
+                per_klass[label] = DocCounter(counter(counts[labels == label]))
+        return self.fit_counter(Counter(counter(counts), update_calls=counts.shape[0]), per_klass)
+
+    def transform_corpus(self, corpus, rows):
+        """Vectors of the texts `rows` of a corpus tokenized by
+        :py:func:`tokenize_corpus`, i.e., ``transform_tokens(corpus_tokens(corpus, rows))``
+
+        :param corpus: Output of :py:func:`tokenize_corpus`
+        :type corpus: tuple
+        :param rows: Indexes of the texts
+        :type rows: list
+        :rtype: csr_matrix
+        """
+        from scipy.sparse import csr_matrix
+        if self.n_features:
+            return self.transform_tokens(self.corpus_tokens(corpus, rows))
+        vocabulary, _, ids = corpus
+        get = self.model.word2id.get
+        ident = np.fromiter((get(x, -1) for x in vocabulary), dtype=np.int64, count=len(vocabulary))
+        position, lengths = self._corpus_rows(corpus, rows)
+        tokens = ident[ids[position]]
+        mask = tokens >= 0
+        lengths = np.bincount(np.repeat(np.arange(lengths.shape[0]), lengths)[mask],
+                              minlength=lengths.shape[0])
+        indptr, indices, data = flat_ids2csr(self.model, lengths, tokens[mask],
+                                             weight=self._weight_array())
+        return csr_matrix((data, indices, indptr), shape=(lengths.shape[0], self.num_terms))
+
+    def _text_tokens(self, text):
+        """Tokens of a text already processed by :py:func:`text_transformations`"""
+        L = []
+        for _ in self.compute_tokens(text):
+            L += _
+        L = self.select_tokens(L)
+        if len(L) == 0:
+            L = ['~']
+        return L
+
+    @property
+    def n_features(self):
+        """Number of buckets of the hashing mode; None keeps the vocabulary"""
+        try:
+            return self._n_features
+        except AttributeError:
+            return None
+
+    @n_features.setter
+    def n_features(self, value):
+        self._n_features = value
+
+    def fit_iter(self, docs, chunksize=1024, n_jobs=1):
+        """
+        Train the model reading the corpus in chunks, i.e., only the
+        vocabulary is kept in memory
+
+        :param docs: Corpus, e.g., :py:func:`microtc.utils.tweet_iterator`
+        :type docs: iterable
+        :param chunksize: Number of documents in each chunk
+        :type chunksize: int
+        :param n_jobs: Number of processes counting the chunks; values less than one use all the cores
+        :type n_jobs: int
+        :rtype: instance
+
+        >>> from b4msa.textmodel import TextModel
+        >>> corpus = ['buenos dias', 'catedras conacyt', 'categorizacion de texto ingeotec']
+        >>> textmodel = TextModel().fit_iter(iter(corpus), chunksize=2)
+        >>> textmodel.model.word2id == TextModel().fit(corpus).model.word2id
+        True
+        """
+
+        from multiprocessing import Pool, cpu_count
+        if n_jobs is None or n_jobs < 1:
+            n_jobs = cpu_count()
+        counter = DocCounter()
+        klass = dict()
+        ndocs = 0
+
+        def merge(part):
+            nonlocal ndocs
+            _counter, _klass = part
+            ndocs += _counter.update_calls
+            counter.update(_counter)
+            for k, v in _klass.items():
+                klass.setdefault(k, DocCounter()).update(v)
+
+        chunks = chunk_iterator(docs, chunksize)
+        if n_jobs == 1:
+            for chunk in chunks:
+                merge(self.count_tokens(chunk))
+        else:
+            with Pool(n_jobs, initializer=_init_worker, initargs=(self,)) as pool:
+                while True:
+                    wave = list(islice(chunks, 2 * n_jobs))
+                    if len(wave) == 0:
+                        break
+                    for part in pool.imap_unordered(_count_chunk, wave):
+                        merge(part)
+        return self.fit_counter(Counter(counter, update_calls=ndocs), klass)
+
+    def partial_fit(self, X):
+        """
+        Update the model with a new batch of documents. The tokens not seen
+        before are appended to the vocabulary (the identifiers of the
+        existing tokens do not change) and the weights are recomputed with
+        the document frequencies of all the documents seen so far.
+
+        The tokens (or buckets) not in the model enter it when they pass
+        the token filters (`token_min_filter`, `token_max_filter`, or
+        `max_dimension`) and the `threshold` computed on the batch; the
+        threshold needs the class of each document (`klass` key). The
+        entropy weighting is not supported.
+
+        :param X: Corpus
+        :type X: lst
+        :rtype: instance
+
+        >>> from b4msa.textmodel import TextModel
+        >>> textmodel = TextModel().partial_fit(['buenos dias', 'catedras conacyt'])
+        >>> textmodel = textmodel.partial_fit(['categorizacion de texto ingeotec'])
+        >>> textmodel.num_terms
+        171
+        """
+
+        if self._threshold > 0 and not all(isinstance(x, dict) and KLASS in x for x in X):
+            raise ValueError("partial_fit needs the class of the documents when threshold > 0")
+        tokens = self.tokenize_many(X)
+        df = self.document_frequency if hasattr(self, 'model') and not self.n_features else None
+        self._model_updated()
+        if self.n_features:
+            if not hasattr(self, 'model'):
+                self.model = HashingTFIDF(n_features=self.n_features, **self._weighting_parameters())
+                self.model.N = 0
+                self.model.df = np.zeros(self.n_features, dtype=np.int64)
+            model = self.model
+            df = model.df.copy()
+            keys = [{model.word2id[x] for x in toks} for toks in tokens]
+            known = set(np.flatnonzero(df).tolist())
+            known.update(self._batch_selection(keys, X, known))
+            counter = Counter()
+            for k in keys:
+                counter.update(k)
+            for bucket, v in counter.items():
+                if bucket in known:
+                    df[bucket] += v
+            model.N += len(tokens)
+            model.df = df
+            return self
+        if issubclass(get_class(self.weighting), Entropy):
+            raise RuntimeError("partial_fit does not support the entropy weighting")
+        if not hasattr(self, 'model'):
+            self.model = unfitted_model(get_class(self.weighting), **self._weighting_parameters())
+            self.model.N = 0
+            self.model.word2id = dict()
+            df = np.zeros(0, dtype=np.int64)
+        model = self.model
+        w2id = dict(model.word2id.items())
+        num_terms = model.num_terms
+        keys = [set(toks) for toks in tokens]
+        for token in self._batch_selection(keys, X, w2id):
+            w2id[token] = num_terms
+            num_terms += 1
+        counter = Counter()
+        for k in keys:
+            counter.update(k)
+        df = np.concatenate((df, np.zeros(num_terms - df.shape[0], dtype=np.int64)))
+        for token, v in counter.items():
+            if token in w2id:
+                df[w2id[token]] += v
+        self._df = df
+        model.N = model.N + len(tokens)
+        model._w2id = w2id
+        model._num_terms = num_terms
+        model.wordWeight = {i: df[i] for i in w2id.values()}
+        return self
+
+    def _batch_selection(self, keys, X, known):
+        """Tokens (buckets) of a batch, not in `known`, that pass the token
+        filters and the threshold computed on the batch (see :py:func:`partial_fit`)
+
+        :param keys: Distinct tokens (buckets) of each document
+        :type keys: list
+        :param X: Documents of the batch
+        :type X: list
+        :param known: Tokens (buckets) in the model
+        :type known: dict or set
+        :rtype: list
+        """
+
+        model = self.model
+        counter = Counter(update_calls=0)
+        for k in keys:
+            counter.update(k)
+        for k in [k for k in counter.keys() if k in known]:
+            del counter[k]
+        if model.max_dimension:
+            size = max(model.token_max_filter - len(known), 0)
+            for k, _ in counter.most_common()[size:]:
+                del counter[k]
+        else:
+            model.filter(counter, token_min_filter=model.token_min_filter,
+                         token_max_filter=model.token_max_filter)
+        selected = list(counter.keys())
+        if self._threshold > 0 and len(selected):
+            index = {k: i for i, k in enumerate(selected)}
+            w = class_entropy(class_histogram(keys, X, index))
+            selected = [k for k, v in zip(selected, w) if v > self._threshold]
+        return selected
+
+    @property
+    def document_frequency(self):
+        """Number of documents containing each token (indexed by identifier).
+        For a model trained with :py:func:`fit` it is recovered from the
+        inverse document frequency.
+
+        :rtype: np.array
+        """
+        try:
+            return self._df
+        except AttributeError:
+            model = self.model
+            df = np.zeros(model.num_terms, dtype=np.int64)
+            weight = model.wordWeight
+            for i in model.word2id.values():
+                df[i] = 1 if isinstance(model, TF) else round(model.N / 2**weight[i])
+            self._df = df
+        return self._df
+
+    @property
+    def _per_klass(self):
+        """Whether training needs the document frequencies per class"""
+        return self._threshold > 0 or (not self.n_features and
+                                       issubclass(get_class(self.weighting), Entropy))
+
+    def count_tokens(self, docs):
+        """
+        Number of documents containing each token, overall and per class
+
+        :param docs: Corpus
+        :type docs: lst
+        :rtype: tuple - :py:class:`microtc.utils.Counter`, dict of counters per class
+        """
+
+        per_klass = self._per_klass
+        w2id = HashingVocabulary(self.n_features) if self.n_features else None
+        docs = list(docs)
+        counter = Counter()
+        klass = dict()
+        for d, tokens in zip(docs, self.tokenize_many(docs)):
+            tokens = set(tokens) if w2id is None else {w2id[x] for x in tokens}
+            counter.update(tokens)
+            if per_klass:
+                klass.setdefault(d[KLASS], DocCounter()).update(tokens)
+        return counter, klass
+
+    def fit_counter(self, counter, klass=None):
+        """
+        Train the model from the document frequencies of the tokens
+
+        :param counter: Document frequency, `update_calls` is the number of documents
+        :type counter: :py:class:`microtc.utils.Counter`
+        :param klass: Document frequency per class, see :py:func:`count_tokens`
+        :type klass: dict
+        :rtype: instance
+        """
+
+        self._model_updated()
+        kw = self._weighting_parameters()
+        if self.n_features:
+            self.model = HashingTFIDF(n_features=self.n_features, **kw)
+            self.model.N = counter.update_calls
+            self.model.fit_counter(counter)
+            if klass:
+                keys = sorted(klass.keys())
+                hist = np.zeros((len(keys), self.n_features))
+                for ki, k in enumerate(keys):
+                    for bucket, v in klass[k].items():
+                        hist[ki, bucket] = v
+                self.model.select(class_entropy(hist) > self._threshold)
+            return self
+        model = unfitted_model(get_class(self.weighting), **kw)
+        model.N = counter.update_calls
+        filter_counter(model, counter)
+        model.word2id, model.wordWeight = model.counter2weight(counter)
+        self.model = model
+
+        if klass:
+            w2id = model.word2id
+            keys = sorted(klass.keys())
+            hist = np.zeros((len(keys), len(w2id)))
+            for ki, k in enumerate(keys):
+                for token, v in klass[k].items():
+                    try:
+                        hist[ki, w2id[token]] = v
+                    except KeyError:
+                        continue
+            w = class_entropy(hist)
+            if isinstance(model, Entropy):
+                model.wordWeight = w
+            if self._threshold > 0:
+                model._w2id = {k: v for k, v in w2id.items() if w[v] > self._threshold}
+        return self
+
+    def _weighting_parameters(self):
+        """Parameters of the weighting scheme used by the fit methods"""
+        return dict(token_min_filter=self.token_min_filter,
+                    token_max_filter=self.token_max_filter,
+                    max_dimension=self.max_dimension,
+                    unit_vector=self.unit_vector)
+
+    def fit_tokens(self, tokens, X):
+        """
+        Train the model from the tokenized corpus
+
+        :param tokens: Tokens of each document, i.e., :py:func:`tokenize` output
+        :type tokens: lst
+        :param X: Corpus
+        :type X: lst
+        :rtype: instance
+        """
+
+        kw = self._weighting_parameters()
+        if self.n_features:
+            self.model = HashingTFIDF(tokens, X=X, n_features=self.n_features, **kw)
+        else:
+            self.model = get_class(self.weighting)(tokens, X=X, **kw)
+        self._model_updated()
 
         if self._threshold > 0:
-            w = Entropy.entropy([self.tokenize(d) for d in X], X, self.model.word2id)
-            self.model._w2id = {k: v for k, v in self.model._w2id.items() if w[v] > self._threshold}
+            w = class_entropy(class_histogram(tokens, X, self.model.word2id))
+            if self.n_features:
+                self.model.select(w > self._threshold)
+            else:
+                self.model._w2id = {k: v for k, v in self.model._w2id.items() if w[v] > self._threshold}
+        return self
+
+    @property
+    def cache_size(self):
+        """Number of vectors kept by the LRU cache used in :py:func:`__getitem__`;
+        zero disables the cache
+
+        >>> from b4msa.textmodel import TextModel
+        >>> textmodel = TextModel(['buenos dias', 'buenas noches'])
+        >>> textmodel.cache_size = 1024
+        >>> _ = textmodel['buenos dias']
+        >>> _ = textmodel['buenos dias']
+        >>> textmodel.cache.hits, textmodel.cache.misses
+        (1, 1)
+        """
+        cache = self.cache
+        return 0 if cache is None else cache.maxsize
+
+    @cache_size.setter
+    def cache_size(self, value):
+        self._cache = LRUCache(value) if value else None
+
+    @property
+    def cache(self):
+        """LRU cache (:py:class:`b4msa.utils.LRUCache`) of text to vector
+
+        :rtype: LRUCache or None
+        """
+        try:
+            return self._cache
+        except AttributeError:
+            return None
+
+    @property
+    def vocabulary_tokenizer(self):
+        """Compute the vectors in :py:func:`__getitem__` with
+        :py:class:`b4msa.tokenizer.VocabularyTokenizer`, i.e., only the
+        tokens in the vocabulary are produced. The tokenizer keeps a trie
+        of the q-grams of the vocabulary, which is rebuilt on first use
+        after loading or training the model.
+
+        >>> from b4msa.textmodel import TextModel
+        >>> corpus = ['buenos dias', 'catedras conacyt', 'categorizacion de texto ingeotec']
+        >>> textmodel = TextModel().fit(corpus)
+        >>> vec = textmodel['buenos dias']
+        >>> textmodel.vocabulary_tokenizer = True
+        >>> textmodel['buenos dias'] == vec
+        True
+        """
+        return self._vocab_tokenizer is not None
+
+    @vocabulary_tokenizer.setter
+    def vocabulary_tokenizer(self, value):
+        if value and not VocabularyTokenizer.supported(self):
+            raise RuntimeError("The vocabulary tokenizer does not support this configuration")
+        self._vocabulary_tokenizer = VocabularyTokenizer(self) if value else None
+
+    @property
+    def _vocab_tokenizer(self):
+        """:py:class:`b4msa.tokenizer.VocabularyTokenizer` in use or None"""
+        try:
+            return self._vocabulary_tokenizer
+        except AttributeError:
+            return None
+
+    def token_ids(self, text):
+        """Identifiers of the tokens of `text` that are in the vocabulary
+
+        :param text: Text
+        :type text: str or dict or list
+        :rtype: list
+        """
+        tokenizer = self._vocab_tokenizer
+        if tokenizer is not None:
+            return tokenizer(text)
+        get = self.model.word2id.get
+        return [i for i in map(get, self.tokenize(text)) if i is not None]
+
+    def csr_arrays(self, texts):
+        """Vectors of `texts` as the arrays of a CSR matrix, computed from
+        the token identifiers of the whole batch (see :py:func:`b4msa.weighting.ids2csr`)
+        instead of building a list of (identifier, weight) per text
+
+        :param texts: Texts
+        :type texts: list
+        :rtype: tuple - indptr, indices, data
+
+        >>> from b4msa.textmodel import TextModel
+        >>> corpus = ['buenos dias', 'catedras conacyt', 'categorizacion de texto ingeotec']
+        >>> textmodel = TextModel().fit(corpus)
+        >>> indptr, indices, data = textmodel.csr_arrays(corpus)
+        >>> indptr.shape
+        (4,)
+        """
+        if self.n_features:
+            X = self.tonp([self[x] for x in texts])
+            return X.indptr, X.indices, X.data
+        if self.vocabulary_tokenizer:
+            ids = [self.token_ids(x) for x in texts]
+            return ids2csr(self.model, ids, weight=self._weight_array())
+        return self._tokens_csr_arrays(self.tokenize_many(texts))
+
+    def _weight_array(self):
+        try:
+            return self._weight
+        except AttributeError:
+            self._weight = weight_array(self.model)
+        return self._weight
+
+    def _tokens_csr_arrays(self, tokens):
+        get = self.model.word2id.get
+        ids = [[i for i in map(get, x) if i is not None] for x in tokens]
+        return ids2csr(self.model, ids, weight=self._weight_array())
+
+    def transform_tokens(self, tokens):
+        """Vectors of documents given their tokens, i.e., ``transform(texts)``
+        where `tokens` is ``tokenize_many(texts)``
+
+        :param tokens: Tokens of each document
+        :type tokens: list
+        :rtype: csr_matrix
+        """
+        from scipy.sparse import csr_matrix
+        if self.n_features:
+            return self.tonp([self.model[x] for x in tokens])
+        indptr, indices, data = self._tokens_csr_arrays(tokens)
+        return csr_matrix((data, indices, indptr), shape=(len(tokens), self.num_terms))
+
+    def _model_updated(self):
+        """Discard the state computed from the previous model"""
+        if self.cache is not None:
+            self.cache.clear()
+        for k in ['_weight', '_df']:
+            try:
+                delattr(self, k)
+            except AttributeError:
+                pass
+        tokenizer = self._vocab_tokenizer
+        if tokenizer is not None:
+            tokenizer.clear()
+
+    def _vector(self, text):
+        tokenizer = self._vocab_tokenizer
+        if tokenizer is None:
+            return super(TextModel, self).__getitem__(text)
+        return ids2weight(self.model, tokenizer(text))
+
+    def __getitem__(self, text):
+        cache = self.cache
+        if cache is None or not isinstance(text, str):
+            return self._vector(text)
+        vec = cache.get(text)
+        if vec is None:
+            vec = self._vector(text)
+            cache[text] = vec
+        return vec
+
+    def text_key(self, text):
+        """Hashable representation of the text processed by :py:func:`tokenize`
+
+        :param text: Text
+        :type text: str or dict or list
+        """
+        if isinstance(text, dict):
+            text = self.get_text(text)
+        if isinstance(text, list):
+            text = tuple(text)
+        return text
+
+    def transform(self, texts, n_jobs=1, chunksize=None, unique=False):
+        """Convert texts into a sparse matrix
+
+        :param texts: List of texts to be transformed
+        :type texts: list
+        :param n_jobs: Number of processes; values less than one use all the cores
+        :type n_jobs: int
+        :param chunksize: Number of texts sent to each process at a time
+        :type chunksize: int
+        :param unique: Vectorize each distinct text only once
+        :type unique: bool
+        :rtype: csr_matrix
+
+        The texts are split in consecutive chunks; each chunk is vectorized
+        in a different process and the resulting matrices are stacked in the
+        original order. With `unique` the repeated texts (e.g., retweets)
+        are transformed once and their rows are copied.
+
+        >>> from b4msa.textmodel import TextModel
+        >>> corpus = ['buenos dias', 'catedras conacyt', 'categorizacion de texto ingeotec']
+        >>> textmodel = TextModel().fit(corpus)
+        >>> textmodel.transform(corpus, n_jobs=2).shape
+        (3, 171)
+        """
+
+        from multiprocessing import Pool, cpu_count
+        from scipy.sparse import vstack
+        if n_jobs is None or n_jobs < 1:
+            n_jobs = cpu_count()
+        texts = list(texts)
+        if unique:
+            index = dict()
+            inverse = [index.setdefault(self.text_key(x), len(index)) for x in texts]
+            if len(index) < len(texts):
+                first = dict()
+                for x, i in zip(texts, inverse):
+                    first.setdefault(i, x)
+                X = self.transform([first[i] for i in range(len(index))],
+                                   n_jobs=n_jobs, chunksize=chunksize)
+                return X[inverse]
+        if n_jobs == 1 or len(texts) < 2:
+            return self._transform(texts)
+        if chunksize is None:
+            chunksize = max(1, len(texts) // (4 * n_jobs))
+        chunks = [texts[i:i + chunksize] for i in range(0, len(texts), chunksize)]
+        with Pool(n_jobs, initializer=_init_worker, initargs=(self,)) as pool:
+            X = pool.map(_transform_chunk, chunks)
+        return vstack(X, format='csr')
+
+    def _transform(self, texts):
+        from scipy.sparse import csr_matrix
+        # the LRU cache works per text, so it keeps the per text vectors
+        if self.cache is not None:
+            return self.tonp([self[x] for x in texts])
+        indptr, indices, data = self.csr_arrays(texts)
+        return csr_matrix((data, indices, indptr), shape=(len(texts), self.num_terms))
+
+    def save_vocabulary(self, fname):
+        """Store the vocabulary in `fname` and replace the token to identifier
+        dictionary with the memory-mapped :py:class:`b4msa.vocabulary.Vocabulary`.
+        The pickled model keeps only the absolute path, so the processes
+        loading it share the vocabulary; to move the model, keep the
+        vocabulary in its directory and read it with
+        :py:func:`b4msa.vocabulary.load_model`.
+
+        :param fname: Path
+        :type fname: str
+        :rtype: instance
+
+        >>> import os, tempfile
+        >>> from b4msa.textmodel import TextModel
+        >>> corpus = ['buenos dias', 'catedras conacyt', 'categorizacion de texto ingeotec']
+        >>> textmodel = TextModel().fit(corpus)
+        >>> vec = textmodel['buenos dias']
+        >>> _ = textmodel.save_vocabulary(os.path.join(tempfile.mkdtemp(), 'voc'))
+        >>> textmodel['buenos dias'] == vec
+        True
+        """
+
+        if self.n_features:
+            raise RuntimeError("The hashing mode does not have a vocabulary")
+        save_vocabulary(self.model.word2id, fname)
+        self.model._w2id = Vocabulary(fname)
+        try:
+            del self._id2token
+        except AttributeError:
+            pass
         return self
 
     def get_word_list(self, *args, **kwargs):
@@ -118,7 +949,7 @@ class TextModel(mTCTextModel):
         text = super(TextModel, self).text_transformations(text)
         if self.lang:
             text = self.lang.transform(text, **self._lang_kw)
-        return re.sub('~+', '~', text)
+        return _collapse_separators(text)
 
     @classmethod
     def default_parameters(self, lang=None):
@@ -162,7 +993,7 @@ class TextModel(mTCTextModel):
 
         >>> from b4msa.textmodel import TextModel
         >>> TextModel.params()
-        ['docs', 'threshold', 'lang', 'negation', 'stemming', 'stopwords', 'kwargs', 'docs', 'text', 'num_option', 'usr_option', 'url_option', 'emo_option', 'hashtag_option', 'ent_option', 'lc', 'del_dup', 'del_punc', 'del_diac', 'token_list', 'token_min_filter', 'token_max_filter', 'select_ent', 'select_suff', 'select_conn', 'weighting']
+        ['docs', 'threshold', 'lang', 'negation', 'stemming', 'stopwords', 'n_features', 'kwargs', 'docs', 'text', 'num_option', 'usr_option', 'url_option', 'emo_option', 'hashtag_option', 'ent_option', 'lc', 'del_dup', 'del_punc', 'del_diac', 'token_list', 'token_min_filter', 'token_max_filter', 'select_ent', 'select_suff', 'select_conn', 'weighting']
         """
         import inspect
         r = mTCTextModel.params()
@@ -171,17 +1002,112 @@ class TextModel(mTCTextModel):
         return list(params) + list(r)
 
 
-def get_model(basename, data, labels, args):
-    modelfile = get_filename(args, os.path.join("models", os.path.basename(basename)))
+_WORKER_MODEL = None
+
+
+def _init_worker(model):
+    """Store the model used by the tasks sent to the worker"""
+    global _WORKER_MODEL
+    _WORKER_MODEL = model
+
+
+def _transform_chunk(texts):
+    """Vectorize a chunk of texts in a worker"""
+    return _WORKER_MODEL._transform(texts)
+
 
-    if not os.path.exists(modelfile):
+def _count_chunk(docs):
+    """Count the tokens of a chunk of documents in a worker"""
+    return _WORKER_MODEL.count_tokens(docs)
 
-        if not os.path.isdir("models"):
-            os.mkdir("models")
 
-        args['docs'] = data
-        model = TextModel(**args)
-        save_model(model, modelfile)
-    else:
-        model = load_model(modelfile)
-    return model
+def model_key(data, labels, args):
+    """Content hash (SHA-256) of the corpus, the labels, and the parameters
+
+    :rtype: str
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps(args, sort_keys=True, default=str).encode('utf-8'))
+    for x in data:
+        h.update(json.dumps(x, sort_keys=True).encode('utf-8'))
+        h.update(b'\n')
+    h.update(json.dumps(labels, default=str).encode('utf-8') if labels is not None else b'')
+    return h.hexdigest()
+
+
+def evict_models(cachedir, max_entries=None, max_bytes=None):
+    """Remove the least recently used models of `cachedir` until there are at
+    most `max_entries` models using at most `max_bytes`"""
+    models = []
+    for x in os.listdir(cachedir):
+        if not x.endswith('.model'):
+            continue
+        try:
+            st = os.stat(os.path.join(cachedir, x))
+        except FileNotFoundError:
+            continue
+        models.append((st.st_mtime, st.st_size, x))
+    models.sort()
+    size = sum([x[1] for x in models])
+    while len(models) and ((max_entries is not None and len(models) > max_entries) or
+                           (max_bytes is not None and size > max_bytes)):
+        _, s, x = models.pop(0)
+        size -= s
+        try:
+            os.unlink(os.path.join(cachedir, x))
+        except OSError:
+            # already removed, or open by another process (Windows)
+            pass
+
+
+def get_model(basename, data, labels, args, cachedir='models',
+              max_entries=None, max_bytes=None):
+    """TextModel trained on `data` with parameters `args`, stored in
+    `cachedir` under the hash of the corpus and the parameters
+    (:py:func:`model_key`). The model is written atomically, concurrent
+    processes wait for the one training the model, and the least recently
+    used models are removed when there are more than `max_entries` or they
+    use more than `max_bytes`; a model removed by another process before
+    it is read is trained again.
+
+    :param basename: Deprecated and ignored, the key depends only on the content; use None
+    :param data: Corpus
+    :type data: list
+    :param labels: Labels
+    :type labels: list
+    :param args: TextModel parameters
+    :type args: dict
+    :rtype: :py:class:`TextModel`
+    """
+
+    if basename is not None:
+        warnings.warn("get_model ignores basename, the models are stored under "
+                      "the hash of their content; pass None", DeprecationWarning, stacklevel=2)
+    os.makedirs(cachedir, exist_ok=True)
+    args = {k: v for k, v in args.items() if k != 'docs'}
+    modelfile = os.path.join(cachedir, model_key(data, labels, args) + '.model')
+    while True:
+        if not os.path.isfile(modelfile):
+            with FileLock(modelfile + '.lock'):
+                if not os.path.isfile(modelfile):
+                    model = TextModel(data, **args)
+                    fd, tmp = tempfile.mkstemp(dir=cachedir, suffix='.tmp')
+                    os.close(fd)
+                    try:
+                        save_model(model, tmp)
+                        os.replace(tmp, modelfile)
+                    finally:
+                        if os.path.isfile(tmp):
+                            os.unlink(tmp)
+                    evict_models(cachedir, max_entries=max_entries, max_bytes=max_bytes)
+                    return model
+        try:
+            model = load_model(modelfile)
+        except FileNotFoundError:
+            # evicted by another process after the isfile check
+            continue
+        try:
+            os.utime(modelfile)
+        except FileNotFoundError:
+            pass
+        return model
@@ -0,0 +1,167 @@
+# Copyright 2016 Mario Graff (https://github.com/mgraffg)
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from bisect import bisect_right
+
+
+class VocabularyTokenizer(object):
+    """Inference tokenizer of a fitted :py:class:`b4msa.textmodel.TextModel`.
+    It returns the identifiers of the tokens of a text that are in the
+    vocabulary, in the order and with the multiplicity produced by
+    :py:func:`b4msa.textmodel.TextModel.tokenize`.
+
+    The character q-grams are computed from the smallest to the largest
+    size, and a position is kept only while the q-gram starting at it is a
+    prefix of a q-gram in the vocabulary; so the q-grams that cannot be in
+    the vocabulary are never built.
+
+    :param textmodel: Fitted text model
+    :type textmodel: :py:class:`b4msa.textmodel.TextModel`
+
+    >>> from b4msa.textmodel import TextModel
+    >>> from b4msa.tokenizer import VocabularyTokenizer
+    >>> corpus = ['buenos dias', 'catedras conacyt', 'categorizacion de texto ingeotec']
+    >>> textmodel = TextModel().fit(corpus)
+    >>> tokenizer = VocabularyTokenizer(textmodel)
+    >>> w2id = textmodel.model.word2id
+    >>> tokenizer('buenas dias') == [w2id[x] for x in textmodel.tokenize('buenas dias') if x in w2id]
+    True
+    """
+
+    def __init__(self, textmodel):
+        self.textmodel = textmodel
+
+    @staticmethod
+    def supported(textmodel):
+        """Whether the tokens of `textmodel` can be computed by the tokenizer"""
+        return not (textmodel.q_grams_words or textmodel.select_suff or
+                    textmodel.select_conn or textmodel.n_features)
+
+    @property
+    def prefixes(self):
+        """Map each q-gram of the vocabulary (without the `q:` tag) to its
+        identifier, and each proper prefix of them that is not in the
+        vocabulary to -1"""
+        try:
+            return self._prefixes
+        except AttributeError:
+            self._build()
+        return self._prefixes
+
+    def _build(self):
+        prefixes = dict()
+        words = dict()
+        for token, ident in self.textmodel.model.word2id.items():
+            if token[:2] == 'q:':
+                qgram = token[2:]
+                prefixes[qgram] = ident
+                for i in range(1, len(qgram)):
+                    prefixes.setdefault(qgram[:i], -1)
+            else:
+                words[token] = ident
+        self._words = words
+        self._prefixes = prefixes
+
+    @property
+    def words(self):
+        """Word n-grams and skip-grams of the vocabulary"""
+        try:
+            return self._words
+        except AttributeError:
+            self._build()
+        return self._words
+
+    def clear(self):
+        """Discard the prefixes and words, e.g., the vocabulary changed"""
+        for k in ['_prefixes', '_words']:
+            try:
+                delattr(self, k)
+            except AttributeError:
+                pass
+
+    def __getstate__(self):
+        # the prefixes and the words are rebuilt on first use
+        return dict(textmodel=self.textmodel)
+
+    @staticmethod
+    def _word_id(words, prefixes, token):
+        # a word starting with q: shares the identifier of the q-gram
+        ident = words.get(token)
+        if ident is None and token[:2] == 'q:':
+            ident = prefixes.get(token[2:])
+            if ident is not None and ident < 0:
+                ident = None
+        return ident
+
+    def __call__(self, text):
+        """Token identifiers of `text`
+
+        :param text: Text
+        :type text: str or dict or list
+        :rtype: list
+        """
+        tm = self.textmodel
+        if isinstance(text, dict):
+            text = tm.get_text(text)
+        if isinstance(text, (list, tuple)):
+            output = []
+            for _text in text:
+                output.extend(self._ids(_text))
+            return output
+        return self._ids(text)
+
+    def _ids(self, text):
+        tm = self.textmodel
+        text = tm.text_transformations(text)
+        words = self.words
+        prefixes = self.prefixes
+        wlist = tm.get_word_list(text)
+        output = []
+        ntokens = 0
+        nwords = len(wlist)
+        for q in tm.n_grams:
+            q = abs(q)
+            for start in range(nwords - q + 1):
+                ntokens += 1
+                ident = self._word_id(words, prefixes, '~'.join(wlist[start:start + q]))
+                if ident is not None:
+                    output.append(ident)
+        for q, skip in tm.skip_grams:
+            for start in range(nwords - (q + (q - 1) * skip) + 1):
+                ntokens += 1
+                ident = self._word_id(words, prefixes,
+                                      '~'.join([wlist[start + i * (1 + skip)] for i in range(q)]))
+                if ident is not None:
+                    output.append(ident)
+        q_grams = tm.q_grams
+        if len(q_grams):
+            get = prefixes.get
+            n = len(text)
+            found = dict()
+            alive = None
+            for q in sorted(set(q_grams)):
+                if alive is None:
+                    alive = range(n - q + 1)
+                else:
+                    alive = alive[:bisect_right(alive, n - q)]
+                values = [get(text[i:i + q]) for i in alive]
+                found[q] = [v for v in values if v is not None and v >= 0]
+                alive = [i for i, v in zip(alive, values) if v is not None]
+            for q in q_grams:
+                ntokens += max(0, n - q + 1)
+                output.extend(found[q])
+        if ntokens == 0:
+            ident = words.get('~')
+            if ident is not None:
+                output.append(ident)
+        return output
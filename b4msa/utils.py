@@ -0,0 +1,206 @@
+# Copyright 2016 Mario Graff (https://github.com/mgraffg)
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import time
+from collections import OrderedDict
+from itertools import islice
+try:
+    import fcntl
+except ImportError:
+    import msvcrt
+    fcntl = None
+
+
+class LRUCache(object):
+    """Bounded mapping that discards the least recently used entry; it can
+    be shared by threads, a concurrent update may discard an extra entry or
+    miss a count but it does not fail
+
+    :param maxsize: Maximum number of entries
+    :type maxsize: int
+
+    >>> from b4msa.utils import LRUCache
+    >>> cache = LRUCache(2)
+    >>> cache['a'] = 1
+    >>> cache['b'] = 2
+    >>> cache.get('a')
+    1
+    >>> cache['c'] = 3
+    >>> cache.get('b') is None
+    True
+    >>> cache.hits, cache.misses
+    (1, 1)
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """Value associated to `key`; it updates the hit and miss counters"""
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            # discarded by another thread
+            pass
+        self.hits += 1
+        return value
+
+    def __setitem__(self, key, value):
+        data = self._data
+        data[key] = value
+        try:
+            data.move_to_end(key)
+            if len(data) > self.maxsize:
+                data.popitem(last=False)
+        except KeyError:
+            pass
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def items(self):
+        return self._data.items()
+
+    def clear(self):
+        """Remove all the entries and reset the counters"""
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        """Fraction of :py:func:`get` calls that found the key
+
+        :rtype: float
+        """
+        total = self.hits + self.misses
+        if total == 0:
+            return 0.0
+        return self.hits / total
+
+    def __getstate__(self):
+        # entries are recomputed on demand; only the bound is preserved
+        return dict(maxsize=self.maxsize)
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+
+def chunk_iterator(iterable, chunksize):
+    """Consecutive lists of (at most) `chunksize` elements
+
+    :param iterable: Elements
+    :param chunksize: Size of each chunk
+    :type chunksize: int
+
+    >>> from b4msa.utils import chunk_iterator
+    >>> list(chunk_iterator(range(5), 2))
+    [[0, 1], [2, 3], [4]]
+    """
+    iterable = iter(iterable)
+    while True:
+        chunk = list(islice(iterable, chunksize))
+        if len(chunk) == 0:
+            return
+        yield chunk
+
+
+class FileLock(object):
+    """Inter-process lock on `fname` based on the advisory locks of the
+    operating system (`flock`, or `msvcrt.locking` on Windows). The
+    operating system releases the lock when the holder exits, so a crashed
+    holder does not leave a stale lock behind. The file is removed on
+    release; a waiter that locked a removed file tries again.
+
+    :param fname: Path of the lock file
+    :type fname: str
+    :param poll: Seconds between attempts (Windows)
+    :type poll: float
+
+    >>> import os, tempfile
+    >>> from b4msa.utils import FileLock
+    >>> fname = os.path.join(tempfile.mkdtemp(), 'lock')
+    >>> with FileLock(fname):
+    ...     os.path.isfile(fname)
+    True
+    >>> os.path.isfile(fname)
+    False
+    """
+
+    def __init__(self, fname, poll=0.1):
+        self.fname = fname
+        self.poll = poll
+
+    def _lock(self, fd):
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            return
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                return
+            except OSError:
+                time.sleep(self.poll)
+
+    def acquire(self):
+        while True:
+            fd = os.open(self.fname, os.O_CREAT | os.O_RDWR)
+            try:
+                self._lock(fd)
+                same = os.path.samestat(os.fstat(fd), os.stat(self.fname))
+            except FileNotFoundError:
+                same = False
+            except BaseException:
+                os.close(fd)
+                raise
+            if same:
+                self._fd = fd
+                return self
+            os.close(fd)
+
+    def release(self):
+        fd = self._fd
+        del self._fd
+        if fcntl is not None:
+            # removed while locked, so the waiters notice it
+            try:
+                os.unlink(self.fname)
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+            return
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        os.close(fd)
+        try:
+            os.unlink(self.fname)
+        except OSError:
+            # a waiter has the file open and holds the lock next
+            pass
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *args):
+        self.release()
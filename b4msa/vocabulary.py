@@ -0,0 +1,171 @@
+# Copyright 2016 Mario Graff (https://github.com/mgraffg)
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import mmap
+import threading
+from collections.abc import Mapping
+import numpy as np
+from .weighting import feature_hash
+
+
+MAGIC = b'B4MSAVOC'
+_HEADER = np.dtype([('magic', 'S8'), ('n', '<i8'), ('nslots', '<i8'), ('nbytes', '<i8')])
+_LOADING = threading.local()
+
+
+def _encode(token):
+    return token.encode('utf-8', 'surrogatepass')
+
+
+def save_vocabulary(word2id, fname):
+    """Store a token to identifier map in the format read by :py:class:`Vocabulary`.
+
+    The file contains the tokens sorted and encoded in UTF-8 in one blob,
+    their offsets, their identifiers, and an open addressing table indexed
+    by :py:func:`b4msa.weighting.feature_hash`.
+
+    :param word2id: Map token to identifier
+    :type word2id: dict
+    :param fname: Path
+    :type fname: str
+    """
+
+    tokens = sorted(word2id.keys())
+    keys = [_encode(x) for x in tokens]
+    n = len(keys)
+    offsets = np.zeros(n + 1, dtype='<i8')
+    offsets[1:] = np.cumsum([len(x) for x in keys])
+    ids = np.array([word2id[x] for x in tokens], dtype='<i8')
+    nslots = 1
+    while nslots < 2 * n:
+        nslots *= 2
+    mask = nslots - 1
+    slots = np.full(nslots, -1, dtype='<i8')
+    for i, k in enumerate(tokens):
+        h = feature_hash(k) & mask
+        while slots[h] >= 0:
+            h = (h + 1) & mask
+        slots[h] = i
+    header = np.array([(MAGIC, n, nslots, offsets[-1])], dtype=_HEADER)
+    tmp = fname + '.tmp'
+    with open(tmp, 'wb') as fpt:
+        fpt.write(header.tobytes())
+        fpt.write(offsets.tobytes())
+        fpt.write(ids.tobytes())
+        fpt.write(slots.tobytes())
+        fpt.write(b''.join(keys))
+    os.replace(tmp, fname)
+
+
+class Vocabulary(Mapping):
+    """Read-only token to identifier map stored in a file created by
+    :py:func:`save_vocabulary`. The file is memory-mapped, so the processes
+    that load the same file share one physical copy; pickling stores only
+    the absolute path. A model moved to another directory finds its
+    vocabulary when both are moved together and the model is read with
+    :py:func:`load_model`.
+
+    :param fname: Path
+    :type fname: str
+
+    >>> import os, tempfile
+    >>> from b4msa.vocabulary import Vocabulary, save_vocabulary
+    >>> fname = os.path.join(tempfile.mkdtemp(), 'voc')
+    >>> save_vocabulary({'buenos': 1, 'dias': 0}, fname)
+    >>> voc = Vocabulary(fname)
+    >>> voc['dias'], 'tardes' in voc, len(voc)
+    (0, False, 2)
+    """
+
+    def __init__(self, fname):
+        self.fname = os.path.abspath(fname)
+        with open(self.fname, 'rb') as fpt:
+            self._mmap = mmap.mmap(fpt.fileno(), 0, access=mmap.ACCESS_READ)
+        header = np.frombuffer(self._mmap, dtype=_HEADER, count=1)[0]
+        if header['magic'] != MAGIC:
+            raise ValueError("Not a vocabulary file: " + self.fname)
+        n, nslots = int(header['n']), int(header['nslots'])
+        offset = _HEADER.itemsize
+        self._offsets = np.frombuffer(self._mmap, dtype='<i8', count=n + 1, offset=offset)
+        offset += self._offsets.nbytes
+        self._ids = np.frombuffer(self._mmap, dtype='<i8', count=n, offset=offset)
+        offset += self._ids.nbytes
+        self._slots = np.frombuffer(self._mmap, dtype='<i8', count=nslots, offset=offset)
+        self._blob = offset + self._slots.nbytes
+        self._n = n
+        self._mask = nslots - 1
+
+    def _key(self, i):
+        start = self._blob + int(self._offsets[i])
+        return self._mmap[start:self._blob + int(self._offsets[i + 1])]
+
+    def __getitem__(self, token):
+        try:
+            key = _encode(token)
+        except AttributeError:
+            raise KeyError(token)
+        slots = self._slots
+        mask = self._mask
+        h = feature_hash(token) & mask
+        while True:
+            i = int(slots[h])
+            if i < 0:
+                raise KeyError(token)
+            if self._key(i) == key:
+                return int(self._ids[i])
+            h = (h + 1) & mask
+
+    def __len__(self):
+        return self._n
+
+    def __iter__(self):
+        for i in range(self._n):
+            yield str(self._key(i), encoding='utf-8', errors='surrogatepass')
+
+    def items(self):
+        ids = self._ids
+        for i, k in enumerate(self):
+            yield k, int(ids[i])
+
+    def __reduce__(self):
+        return _open_vocabulary, (self.fname, )
+
+
+def _open_vocabulary(fname):
+    """:py:class:`Vocabulary` stored in `fname` or, when it is not there,
+    in the directory of the model read by :py:func:`load_model`"""
+    if not os.path.isfile(fname):
+        for path in reversed(getattr(_LOADING, 'dirs', [])):
+            moved = os.path.join(path, os.path.basename(fname))
+            if os.path.isfile(moved):
+                return Vocabulary(moved)
+    return Vocabulary(fname)
+
+
+def load_model(fname):
+    """:py:func:`microtc.utils.load_model` where a :py:class:`Vocabulary`
+    missing from the path it was saved with is looked up in the directory
+    of `fname`; so a model and its vocabulary can be moved (or shipped to
+    another machine) together, keeping the vocabulary next to the model.
+
+    :param fname: Path of the model
+    :type fname: str
+    """
+    from microtc.utils import load_model as _load_model
+    dirs = _LOADING.__dict__.setdefault('dirs', [])
+    dirs.append(os.path.dirname(os.path.abspath(fname)))
+    try:
+        return _load_model(fname)
+    finally:
+        dirs.pop()
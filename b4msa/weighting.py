@@ -0,0 +1,350 @@
+# Copyright 2016 Mario Graff (https://github.com/mgraffg)
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from zlib import crc32
+from collections import Counter as DocCounter
+import numpy as np
+from microtc.weighting import TFIDF, TF, Entropy
+from microtc.utils import Counter
+
+
+_SIGN = 1 << 31
+
+
+def feature_hash(token):
+    """Stable 32-bit hash of a token (CRC32 of its UTF-8 encoding)
+
+    :param token: Token
+    :type token: str
+    :rtype: int
+
+    >>> from b4msa.weighting import feature_hash
+    >>> feature_hash('q:hol')
+    2107893284
+    """
+    return crc32(token.encode('utf-8', 'surrogatepass'))
+
+
+def ids2weight(model, ids):
+    """Vector of a document given the identifiers of its tokens; it is
+    equivalent to ``model[tokens]`` where `ids` are the identifiers of the
+    `tokens` found in the vocabulary (see :py:class:`b4msa.tokenizer.VocabularyTokenizer`)
+
+    :param model: Weighting scheme (TFIDF, TF, or Entropy)
+    :type model: :py:class:`microtc.weighting.TFIDF`
+    :param ids: Token identifiers with repetitions
+    :type ids: list
+    :rtype: list
+
+    >>> from microtc.weighting import TFIDF
+    >>> from b4msa.weighting import ids2weight
+    >>> tokens = [['buenos', 'dia', 'microtc'], ['excelente', 'dia'], ['buenas', 'tardes']]
+    >>> tfidf = TFIDF(tokens)
+    >>> w2id = tfidf.word2id
+    >>> ids2weight(tfidf, [w2id['buenos'], w2id['dia']]) == tfidf['buenos', 'X', 'dia']
+    True
+    """
+
+    if isinstance(model, HashingTFIDF):
+        raise RuntimeError("The hashing mode does not have token identifiers")
+    counts = DocCounter(ids)
+    ids = list(counts.keys())
+    weight = model.wordWeight
+    tf = np.array(list(counts.values()))
+    tf = tf / tf.sum()
+    df = np.array([weight[x] for x in ids])
+    if isinstance(model, Entropy):
+        return [(i, _df) for i, _df in zip(ids, df)]
+    if isinstance(model, TF):
+        return [(i, _tf) for i, _tf in zip(ids, tf)]
+    tf_df = tf * df
+    if not model.unit_vector:
+        return [(i, v) for i, v in zip(ids, tf_df)]
+    n = np.sqrt((tf_df**2).sum())
+    return [(i, v) for i, v in zip(ids, tf_df / n)]
+
+
+def weight_array(model):
+    """Weight of each token (`wordWeight`) as an array indexed by identifier
+
+    :param model: Weighting scheme (TFIDF, TF, or Entropy)
+    :type model: :py:class:`microtc.weighting.TFIDF`
+    :rtype: np.array
+    """
+
+    weight = model.wordWeight
+    output = np.zeros(model.num_terms)
+    if len(weight):
+        output[np.fromiter(weight.keys(), dtype=np.int64)] = np.fromiter(weight.values(),
+                                                                         dtype=np.float64)
+    return output
+
+
+def ids2csr(model, ids, weight=None):
+    """Vectors of a batch of documents given the identifiers of their tokens
+    as the arrays of a CSR matrix; row `i` is ``ids2weight(model, ids[i])``
+    with the columns sorted.
+
+    :param model: Weighting scheme (TFIDF, TF, or Entropy)
+    :type model: :py:class:`microtc.weighting.TFIDF`
+    :param ids: Token identifiers of each document
+    :type ids: list
+    :param weight: Output of :py:func:`weight_array`
+    :type weight: np.array
+    :rtype: tuple - indptr, indices, data
+
+    >>> from microtc.weighting import TFIDF
+    >>> from b4msa.weighting import ids2csr
+    >>> tokens = [['buenos', 'dia', 'microtc'], ['excelente', 'dia'], ['buenas', 'tardes']]
+    >>> tfidf = TFIDF(tokens)
+    >>> w2id = tfidf.word2id
+    >>> indptr, indices, data = ids2csr(tfidf, [[w2id['dia']], [], [w2id['buenas']] * 2])
+    >>> indptr
+    array([0, 1, 1, 2])
+    """
+
+    ndocs = len(ids)
+    lengths = np.fromiter((len(x) for x in ids), dtype=np.int64, count=ndocs)
+    tokens = np.fromiter((i for x in ids for i in x), dtype=np.int64, count=lengths.sum())
+    return flat_ids2csr(model, lengths, tokens, weight=weight)
+
+
+def flat_ids2csr(model, lengths, tokens, weight=None):
+    """:py:func:`ids2csr` where the identifiers of the documents are
+    concatenated in `tokens` and `lengths` has the number of identifiers of
+    each document
+
+    :param model: Weighting scheme (TFIDF, TF, or Entropy)
+    :type model: :py:class:`microtc.weighting.TFIDF`
+    :param lengths: Number of identifiers of each document
+    :type lengths: np.array
+    :param tokens: Token identifiers
+    :type tokens: np.array
+    :param weight: Output of :py:func:`weight_array`
+    :type weight: np.array
+    :rtype: tuple - indptr, indices, data
+    """
+
+    if isinstance(model, HashingTFIDF):
+        raise RuntimeError("The hashing mode does not have token identifiers")
+    if weight is None:
+        weight = weight_array(model)
+    ndocs = lengths.shape[0]
+    tokens = np.asarray(tokens, dtype=np.int64)
+    rows = np.repeat(np.arange(ndocs, dtype=np.int64), lengths)
+    num_terms = max(model.num_terms, 1)
+    key, first, tf = np.unique(rows * num_terms + tokens, return_index=True, return_counts=True)
+    rows = key // num_terms
+    indices = key - rows * num_terms
+    indptr = np.zeros(ndocs + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=ndocs), out=indptr[1:])
+    if isinstance(model, Entropy):
+        return indptr, indices, weight[indices]
+    tf = tf / lengths[rows]
+    if isinstance(model, TF):
+        return indptr, indices, tf
+    data = tf * weight[indices]
+    if model.unit_vector:
+        # the norm adds the tokens in order of appearance with the summation
+        # of ndarray.sum, so the vectors are identical to the ones of ids2weight
+        square = data[np.argsort(first, kind='stable')]**2
+        bounds = indptr.tolist()
+        norm = np.sqrt(np.array([square[start:end].sum()
+                                 for start, end in zip(bounds[:-1], bounds[1:])]))
+        data = data / norm[rows]
+    return indptr, indices, data
+
+
+def unfitted_model(cls, **kwargs):
+    """Weighting scheme `cls` without documents, i.e., ``cls([], **kwargs)``;
+    :py:class:`microtc.weighting.Entropy` needs the classes to be built, so
+    only its :py:class:`microtc.weighting.TFIDF` part is initialized
+
+    :param cls: Weighting scheme
+    :type cls: class
+    :rtype: instance
+    """
+
+    if issubclass(cls, Entropy):
+        model = cls.__new__(cls)
+        TFIDF.__init__(model, [], **kwargs)
+        return model
+    return cls([], **kwargs)
+
+
+def filter_counter(model, counter):
+    """Remove from `counter` the tokens that :py:func:`microtc.weighting.TFIDF.fit`
+    discards: the ones in all the documents (`model.N`), and the ones
+    outside the `max_dimension` most common or the token filters of `model`
+
+    :param model: Weighting scheme
+    :type model: :py:class:`microtc.weighting.TFIDF`
+    :param counter: Number of documents containing each token
+    :type counter: :py:class:`microtc.utils.Counter`
+    :rtype: :py:class:`microtc.utils.Counter`
+    """
+
+    N = model.N
+    for k in [k for k, v in counter.items() if v >= N]:
+        del counter[k]
+    if model.max_dimension:
+        assert isinstance(model.token_max_filter, int) and model.token_max_filter > 1
+        for k, _ in counter.most_common()[model.token_max_filter:]:
+            del counter[k]
+    else:
+        model.filter(counter, token_min_filter=model.token_min_filter,
+                     token_max_filter=model.token_max_filter)
+    return counter
+
+
+class HashingVocabulary(object):
+    """Token to bucket map used by :py:class:`HashingTFIDF`, it behaves as
+    the token to identifier dictionary of the other weighting schemes
+
+    :param n_features: Number of buckets
+    :type n_features: int
+    """
+
+    def __init__(self, n_features):
+        self.n_features = n_features
+
+    def __getitem__(self, token):
+        return feature_hash(token) % self.n_features
+
+    def __contains__(self, token):
+        return True
+
+    def __len__(self):
+        return self.n_features
+
+
+class HashingTFIDF(TFIDF):
+    """
+    TFIDF where the tokens are mapped to `n_features` buckets with
+    :py:func:`feature_hash`, so the model does not store the vocabulary.
+
+    The document frequency is computed per bucket, i.e., a bucket shared by
+    frequent tokens receives a low weight, and the most significant bit of
+    the hash gives the sign of each occurrence so that colliding tokens
+    cancel out instead of adding up.
+
+    :param docs: corpus as a list of list of tokens
+    :type docs: list
+    :param n_features: Number of buckets
+    :type n_features: int
+
+    >>> from b4msa.weighting import HashingTFIDF
+    >>> tokens = [['buenos', 'dia', 'microtc'], ['excelente', 'dia'], ['buenas', 'tardes']]
+    >>> tfidf = HashingTFIDF(tokens, n_features=2**10)
+    >>> vector = tfidf['buenos', 'X', 'dia']
+    >>> tfidf.num_terms
+    1024
+    """
+
+    def __init__(self, docs=[], X=None, n_features=2**20, **kwargs):
+        self.n_features = n_features
+        super(HashingTFIDF, self).__init__(docs, X=X, **kwargs)
+
+    def fit(self, docs, X=None):
+        self.N = len(docs)
+        word2id = self.word2id
+        counter = Counter()
+        for tokens in docs:
+            counter.update({word2id[x] for x in tokens})
+        return self.fit_counter(counter)
+
+    def fit_counter(self, counter):
+        """Set the document frequency of the buckets
+
+        :param counter: Number of documents containing each bucket
+        :type counter: :py:class:`microtc.utils.Counter`
+        """
+
+        seen = np.fromiter(counter.keys(), dtype=np.int64, count=len(counter))
+        filter_counter(self, counter)
+        df = np.zeros(self.n_features, dtype=np.int64)
+        if len(counter):
+            df[np.fromiter(counter.keys(), dtype=np.int64)] = np.fromiter(counter.values(),
+                                                                          dtype=np.int64)
+        rejected = np.zeros(self.n_features, dtype=bool)
+        rejected[seen] = df[seen] == 0
+        self._rejected = rejected
+        self.df = df
+        return self
+
+    @property
+    def rejected(self):
+        """Buckets discarded by the filters or by :py:func:`select`; their
+        document frequency is kept at zero"""
+        try:
+            return self._rejected
+        except AttributeError:
+            self._rejected = np.zeros(self.n_features, dtype=bool)
+        return self._rejected
+
+    @property
+    def df(self):
+        """Number of documents containing each bucket"""
+        return self._df
+
+    @df.setter
+    def df(self, value):
+        value = np.where(self.rejected, 0, value)
+        self._df = value
+        weight = np.zeros(self.n_features)
+        m = value > 0
+        weight[m] = np.log2(self.N / value[m])
+        self._weight = weight
+
+    @property
+    def num_terms(self):
+        return self.n_features
+
+    @property
+    def word2id(self):
+        return HashingVocabulary(self.n_features)
+
+    @property
+    def wordWeight(self):
+        """Inverse document frequency of each bucket (zero for the unused ones)"""
+        return self._weight
+
+    def select(self, mask):
+        """Discard the buckets where `mask` is False; the document frequency
+        of the discarded buckets is set to zero and stays there"""
+        self.rejected[~np.asarray(mask) & (self._df > 0)] = True
+        self.df = self._df
+
+    def doc2weight(self, tokens):
+        n = self.n_features
+        weight = self._weight
+        tf = dict()
+        total = 0
+        for token in tokens:
+            h = feature_hash(token)
+            i = h % n
+            if weight[i] == 0:
+                continue
+            total += 1
+            tf[i] = tf.get(i, 0) + (-1 if h & _SIGN else 1)
+        ids = [k for k, v in tf.items() if v != 0]
+        tf = np.array([tf[k] for k in ids]) / max(total, 1)
+        return ids, tf, weight[ids]
+
+    def __getitem__(self, tokens):
+        ids, tfs, dfs = self.doc2weight(tokens)
+        tf_df = tfs * dfs
+        if not self.unit_vector or len(ids) == 0:
+            return [(i, v) for i, v in zip(ids, tf_df)]
+        n = np.sqrt((tf_df**2).sum())
+        return [(i, v) for i, v in zip(ids, tf_df / n)]
@@ -0,0 +1,77 @@
+# Copyright 2016 Mario Graff (https://github.com/mgraffg)
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Corpus of the benchmarks.
+
+The documents are read from the JSON-lines file given in the environment
+variable ``B4MSA_CORPUS``, one object per line with the `text` and
+`klass` keys, e.g.,
+
+    B4MSA_CORPUS=tweets.json PYTHONPATH=. python benchmarks/transform.py
+
+Without it, the nine tweets of ``b4msa/tests/text.json`` are repeated with
+the index of each copy appended. This only checks that a benchmark runs:
+the repeated texts favor every cache and memo, so the numbers do not
+describe a real corpus.
+"""
+import os
+import sys
+from itertools import islice
+from microtc.utils import tweet_iterator
+from microtc.textmodel import TextModel
+
+
+FIXTURE = os.path.join(os.path.dirname(__file__), '..', 'b4msa', 'tests', 'text.json')
+
+
+def documents(ndocs):
+    """The first `ndocs` documents of ``B4MSA_CORPUS`` (fewer when the file
+    is shorter) or, when it is not set, `ndocs` copies of the test fixture
+
+    :param ndocs: Number of documents
+    :type ndocs: int
+    :rtype: list
+    """
+
+    fname = os.environ.get('B4MSA_CORPUS')
+    if fname:
+        return list(islice(tweet_iterator(fname), ndocs))
+    print("B4MSA_CORPUS is not set, running on the test fixture (smoke test)", file=sys.stderr)
+    tw = list(tweet_iterator(FIXTURE))
+    return [dict(text=tw[i % len(tw)]['text'] + ' %d' % i, klass=tw[i % len(tw)]['klass'])
+            for i in range(ndocs)]
+
+
+def texts(ndocs):
+    """Text of :py:func:`documents`
+
+    :param ndocs: Number of documents
+    :type ndocs: int
+    :rtype: list
+    """
+
+    return [x['text'] for x in documents(ndocs)]
+
+
+def transformed(ndocs):
+    """Text of :py:func:`documents` after
+    :py:func:`microtc.textmodel.TextModel.text_transformations`, i.e., the
+    input of the :py:class:`b4msa.lang_dependency.LangDependency` methods
+
+    :param ndocs: Number of documents
+    :type ndocs: int
+    :rtype: list
+    """
+
+    tm = TextModel()
+    return [tm.text_transformations(x) for x in texts(ndocs)]
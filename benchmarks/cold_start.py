@@ -0,0 +1,73 @@
+# Copyright 2016 Mario Graff (https://github.com/mgraffg)
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Time to the first prediction of a stored model in a new process, reading
+the language resources from :py:data:`b4msa.lang_dependency.RESOURCE_PACK`
+and from the text files. The modules are imported before starting the clock.
+
+    PYTHONPATH=. python benchmarks/cold_start.py [nruns]
+"""
+import os
+import sys
+import subprocess
+import tempfile
+import numpy as np
+from microtc.utils import save_model
+from _corpus import documents
+from b4msa.textmodel import TextModel
+from b4msa.classifier import SVC
+
+
+PROGRAM = """
+import sys
+from time import time
+from b4msa import lang_dependency
+from microtc.utils import load_model
+import b4msa.classifier
+import nltk.stem.snowball
+if sys.argv[2] == 'text':
+    lang_dependency._PACK = dict()
+if sys.argv[3] == 'resources':
+    st = time()
+    for lang in ['spanish', 'english', 'italian', 'arabic']:
+        ld = lang_dependency.LangDependency(lang)
+        ld.stopword_set
+        if lang != 'arabic':
+            ld.neg_stopwords
+else:
+    st = time()
+    svc = load_model(sys.argv[1])
+    svc.predict_text('no me gusta la lluvia')
+print(time() - st)
+"""
+
+
+def main(nruns=10):
+    D = documents(1000)
+    tm = TextModel(D, lang='spanish', negation=True, stemming=True, stopwords='delete')
+    svc = SVC(tm).fit(tm.transform(D), [x['klass'] for x in D])
+    fname = os.path.join(tempfile.mkdtemp(), 'svc.model')
+    save_model(svc, fname)
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.path.join(os.path.dirname(__file__), '..')
+    for task in ['resources', 'prediction']:
+        for source in ['text', 'pack']:
+            times = [float(subprocess.check_output([sys.executable, '-c', PROGRAM,
+                                                    fname, source, task], env=env))
+                     for _ in range(nruns)]
+            print("{0:>10} {1:>4} {2:8.2f} ms (median of {3} processes)".format(
+                task, source, 1e3 * np.median(times), nruns))
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
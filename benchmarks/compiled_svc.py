@@ -0,0 +1,47 @@
+# Copyright 2016 Mario Graff (https://github.com/mgraffg)
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Single-document latency of :py:func:`b4msa.classifier.SVC.predict_text`
+and of :py:func:`b4msa.classifier.CompiledSVC.predict_text`, and the
+time spent computing the token identifiers.
+
+    PYTHONPATH=. python benchmarks/compiled_svc.py [ndocs]
+"""
+import sys
+from time import time
+from _corpus import documents
+from b4msa.textmodel import TextModel
+from b4msa.classifier import SVC
+
+
+def main(ndocs=10000):
+    D = documents(ndocs)
+    ndocs = len(D)
+    X = [x['text'] for x in D]
+    tm = TextModel(D[:1000])
+    svc = SVC(tm).fit(tm.transform(D[:1000]), [x['klass'] for x in D[:1000]])
+    scorer = svc.compile()
+    for flag in [False, True]:
+        tm.vocabulary_tokenizer = flag
+        for name, func in [('SVC', svc.predict_text), ('CompiledSVC', scorer.predict_text),
+                           ('token_ids', tm.token_ids)]:
+            st = time()
+            for x in X:
+                func(x)
+            t = time() - st
+            print("vocabulary_tokenizer={0!s:>5} {1:>12} {2:8.1f} us/text".format(
+                flag, name, 1e6 * t / ndocs))
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
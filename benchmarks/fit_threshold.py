@@ -0,0 +1,47 @@
+# Copyright 2016 Mario Graff (https://github.com/mgraffg)
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Time of :py:func:`b4msa.textmodel.TextModel.fit` with `threshold > 0`
+against tokenizing the corpus twice (the previous implementation).
+
+    PYTHONPATH=. python benchmarks/fit_threshold.py [ndocs]
+"""
+import sys
+from time import time
+from microtc.textmodel import TextModel as mTCTextModel
+from microtc.weighting import Entropy
+from _corpus import documents
+from b4msa.textmodel import TextModel
+
+
+def two_passes(tm, X):
+    mTCTextModel.fit(tm, X)
+    w = Entropy.entropy([tm.tokenize(d) for d in X], X, tm.model.word2id)
+    tm.model._w2id = {k: v for k, v in tm.model._w2id.items() if w[v] > tm._threshold}
+    return tm
+
+
+def main(ndocs=20000):
+    X = documents(ndocs)
+    st = time()
+    a = two_passes(TextModel(lang='spanish', threshold=0.01), X)
+    t0 = time() - st
+    st = time()
+    b = TextModel(lang='spanish', threshold=0.01).fit(X)
+    t1 = time() - st
+    assert a.model._w2id == b.model._w2id
+    print("two passes {0:.2f}s single pass {1:.2f}s speedup={2:.2f}".format(t0, t1, t0 / t1))
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
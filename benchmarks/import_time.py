@@ -0,0 +1,52 @@
+# Copyright 2016 Mario Graff (https://github.com/mgraffg)
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Cold start of `import b4msa` and of each command line entry point
+(up to parsing `--version`), measured in a fresh interpreter.
+
+    PYTHONPATH=. python benchmarks/import_time.py [repetitions]
+"""
+import sys
+import subprocess
+from time import time
+
+
+CODE = """import sys
+sys.argv = ['b4msa', '--version']
+from b4msa import command_line
+try:
+    command_line.{0}()
+except SystemExit:
+    pass
+"""
+
+
+def cold_start(code, repetitions):
+    times = []
+    for _ in range(repetitions):
+        st = time()
+        subprocess.check_call([sys.executable, '-c', code], stdout=subprocess.DEVNULL)
+        times.append(time() - st)
+    return min(times)
+
+
+def main(repetitions=5):
+    base = cold_start('pass', repetitions)
+    print("{0:>12} {1:8.3f}s".format('python', base))
+    print("{0:>12} {1:8.3f}s".format('b4msa', cold_start('import b4msa', repetitions)))
+    for func in ['params', 'train', 'test', 'textmodel', 'kfolds']:
+        print("{0:>12} {1:8.3f}s".format(func, cold_start(CODE.format(func), repetitions)))
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
@@ -0,0 +1,49 @@
+# Copyright 2016 Mario Graff (https://github.com/mgraffg)
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Time of :py:func:`b4msa.classifier.SVC.predict_kfold` against training
+a :py:class:`b4msa.textmodel.TextModel` per fold with
+:py:func:`b4msa.classifier.SVC.train_predict_pool`.
+
+    PYTHONPATH=. python benchmarks/kfold.py [ndocs] [n_folds]
+"""
+import sys
+from time import time
+import numpy as np
+from sklearn.model_selection import StratifiedKFold
+from _corpus import documents
+from b4msa.classifier import SVC
+
+
+PARAMS = [dict(), dict(lang='spanish', negation=True, stemming=True, stopwords='delete')]
+
+
+def main(ndocs=5000, n_folds=10):
+    D = documents(ndocs)
+    X = [x['text'] for x in D]
+    y = np.array([x['klass'] for x in D])
+    kfolds = list(StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=0).split(X, y))
+    for params in PARAMS:
+        st = time()
+        for tr, ts in kfolds:
+            SVC.train_predict_pool((X, y, tr, ts, params))
+        t = time() - st
+        print("{0!s:>70} {1:>18} {2:6.2f} s".format(params, 'train_predict_pool', t))
+        st = time()
+        SVC.predict_kfold(X, y, kfolds=kfolds, textModel_params=params, use_tqdm=False)
+        t = time() - st
+        print("{0!s:>70} {1:>18} {2:6.2f} s".format(params, 'predict_kfold', t))
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
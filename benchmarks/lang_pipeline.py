@@ -0,0 +1,70 @@
+# Copyright 2016 Mario Graff (https://github.com/mgraffg)
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Latency and peak allocation per document of
+:py:func:`b4msa.lang_dependency.LangDependency.transform` (negation, then
+stemming and stopwords on one list of tokens) compared with applying
+negation, stemming, and stopwords one after the other.
+
+    PYTHONPATH=. python benchmarks/lang_pipeline.py [ndocs]
+"""
+import sys
+import tracemalloc
+from time import time
+from _corpus import transformed
+from b4msa.lang_dependency import LangDependency
+
+
+def latency(func, X):
+    st = time()
+    for x in X:
+        func(x)
+    return 1e6 * (time() - st) / len(X)
+
+
+def allocation(func, X):
+    tracemalloc.start()
+    total = 0
+    for x in X:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        func(x)
+        total += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return total / len(X)
+
+
+def main(ndocs=20000):
+    X = transformed(ndocs)
+    ndocs = len(X)
+    lang = LangDependency('spanish')
+    kw = dict(stemming=True, stopwords='delete')
+
+    def steps(text):
+        text = lang.negation(text)
+        text = lang.stemming(text)
+        return lang.filterStopWords(text, 'delete')
+
+    for negation in [False, True]:
+        funcs = [('three passes', steps if negation else
+                  lambda x: lang.filterStopWords(lang.stemming(x), 'delete')),
+                 ('transform', lambda x: lang.transform(x, negation=negation, **kw))]
+        for name, func in funcs:
+            func(X[0])
+            [func(x) for x in X]
+            print("negation={0!s:>5} {1:>12} {2:8.2f} us/doc {3:8.0f} peak bytes/doc".format(
+                negation, name, latency(func, X), allocation(func, X[:ndocs // 10])))
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
@@ -0,0 +1,38 @@
+# Copyright 2016 Mario Graff (https://github.com/mgraffg)
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Cost of creating a :py:class:`b4msa.textmodel.TextModel` with a
+language and tokenizing one text, as done for every fold of every
+configuration of the parameter search; the model takes the shared
+instance of :py:func:`b4msa.lang_dependency.get_lang_dependency`.
+
+    PYTHONPATH=. python benchmarks/lang_registry.py [nmodels]
+"""
+import sys
+from time import time
+from b4msa.textmodel import TextModel
+
+
+def main(nmodels=1000):
+    for lang in ['spanish', 'english', 'italian']:
+        TextModel(lang=lang, negation=True, stemming=True).tokenize('no me gusta')
+        st = time()
+        for _ in range(nmodels):
+            tm = TextModel(lang=lang, negation=True, stemming=True, stopwords='delete')
+            tm.tokenize('no me gusta la lluvia')
+        t = time() - st
+        print("{0:>8} {1:8.1f} us/model".format(lang, 1e6 * t / nmodels))
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
@@ -0,0 +1,54 @@
+# Copyright 2016 Mario Graff (https://github.com/mgraffg)
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Throughput of :py:func:`b4msa.lang_dependency.LangDependency.negation`
+for each language with negation rules; the Spanish texts are the corpus
+of the benchmarks and the English and Italian ones a few sentences.
+
+    PYTHONPATH=. python benchmarks/negation.py [ndocs]
+"""
+import sys
+from time import time
+from microtc.textmodel import TextModel
+from _corpus import transformed
+from b4msa.lang_dependency import LangDependency
+
+
+TEXTS = dict(english=["I do not like the weather", "I can't see any tweet",
+                      "she won't go, neither will he", "it is not the best movie ever"],
+             italian=["non mi piace la pizza", "senza amore non si vive",
+                      "mai visto niente del genere", "non lo so"])
+
+
+def corpus(ndocs, lang):
+    if lang == 'spanish':
+        return transformed(ndocs)
+    tm = TextModel()
+    tw = TEXTS[lang]
+    return [tm.text_transformations(tw[i % len(tw)] + ' %d' % i) for i in range(ndocs)]
+
+
+def main(ndocs=20000):
+    for lang in ['spanish', 'english', 'italian']:
+        X = corpus(ndocs, lang)
+        lang = LangDependency(lang)
+        lang.negation(X[0])
+        st = time()
+        for x in X:
+            lang.negation(x)
+        t = time() - st
+        print("{0:>8} {1:10.0f} docs/s".format(lang.lang, len(X) / t))
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
@@ -0,0 +1,65 @@
+# Copyright 2016 Mario Graff (https://github.com/mgraffg)
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Throughput of :py:func:`b4msa.classifier.SVC.predict_file` against
+calling :py:func:`b4msa.classifier.SVC.predict_text` per document, and
+peak memory of :py:func:`b4msa.classifier.SVC.predict_iter` as the file grows.
+
+    PYTHONPATH=. python benchmarks/predict_file.py [ndocs]
+"""
+import os
+import sys
+import json
+import tempfile
+import tracemalloc
+from time import time
+from collections import deque
+from microtc.utils import tweet_iterator
+from _corpus import documents
+from b4msa.textmodel import TextModel
+from b4msa.classifier import SVC
+
+
+def store(D):
+    fname = os.path.join(tempfile.mkdtemp(), 'test.json')
+    with open(fname, 'w') as fpt:
+        for x in D:
+            fpt.write(json.dumps(x) + '\n')
+    return fname
+
+
+def main(ndocs=20000):
+    D = documents(ndocs)
+    ndocs = len(D)
+    tm = TextModel(D[:1000])
+    svc = SVC(tm).fit(tm.transform(D[:1000]), [x['klass'] for x in D[:1000]])
+    fname = store(D)
+    st = time()
+    [svc.predict_text(x['text']) for x in tweet_iterator(fname)]
+    t = time() - st
+    print("{0:>12} {1:10.0f} docs/s".format('predict_text', ndocs / t))
+    st = time()
+    svc.predict_file(fname)
+    t = time() - st
+    print("{0:>12} {1:10.0f} docs/s".format('predict_file', ndocs / t))
+    for n in [ndocs // 10, ndocs]:
+        fname = store(D[:n])
+        tracemalloc.start()
+        deque(svc.predict_iter(x['text'] for x in tweet_iterator(fname)), maxlen=0)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print("{0:>12} {1:8d} docs peak {2:8.1f} MB".format('predict_iter', n, peak / 2**20))
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
@@ -0,0 +1,63 @@
+# Copyright 2016 Mario Graff (https://github.com/mgraffg)
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""k-fold accuracy of :py:class:`b4msa.classifier.SVC` with the float64
+coefficients and quantized with :py:func:`b4msa.classifier.SVC.quantize`,
+the fraction of predictions that change, and the size of the stored classifier.
+
+    PYTHONPATH=. python benchmarks/quantize.py [ndocs] [n_folds]
+"""
+import sys
+import copy
+import pickle
+import numpy as np
+from sklearn.model_selection import StratifiedKFold
+from _corpus import documents
+from b4msa.textmodel import TextModel
+from b4msa.classifier import SVC
+
+
+def main(ndocs=5000, n_folds=5):
+    D = documents(ndocs)
+    ndocs = len(D)
+    X = [x['text'] for x in D]
+    y = np.array([x['klass'] for x in D])
+    # labels shuffled in 20% of the documents so that the task is not trivial
+    rng = np.random.RandomState(0)
+    noise = rng.rand(ndocs) < 0.2
+    y[noise] = rng.permutation(y[noise])
+    dtypes = [None, np.float16, np.int8]
+    hits = {k: 0 for k in dtypes}
+    changes = {k: 0 for k in dtypes}
+    size = {k: 0 for k in dtypes}
+    kfolds = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=0)
+    for tr, ts in kfolds.split(X, y):
+        tm = TextModel([X[i] for i in tr])
+        svc = SVC(tm, random_state=0).fit(tm.transform([X[i] for i in tr]), y[tr])
+        Xt = tm.transform([X[i] for i in ts])
+        hy = svc.predict(Xt)
+        for dtype in dtypes:
+            m = svc if dtype is None else copy.deepcopy(svc).quantize(dtype)
+            _hy = m.predict(Xt)
+            hits[dtype] += (_hy == y[ts]).sum()
+            changes[dtype] += (_hy != hy).sum()
+            size[dtype] += len(pickle.dumps(m.svc))
+    for dtype in dtypes:
+        name = 'float64' if dtype is None else dtype.__name__
+        print("{0:>8} accuracy {1:.4f} (delta {2:+.4f}) changed {3:.4f} classifier {4:8.1f} KB".format(
+            name, hits[dtype] / ndocs, (hits[dtype] - hits[None]) / ndocs,
+            changes[dtype] / ndocs, size[dtype] / n_folds / 1024))
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
@@ -0,0 +1,64 @@
+# Copyright 2016 Mario Graff (https://github.com/mgraffg)
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Bytes sent to the pool per fold by :py:func:`b4msa.classifier.SVC.predict_kfold`
+when the corpus travels with each task and when the workers memory-map a
+:py:class:`b4msa.corpus.SharedCorpus`, and the time of ``predict_kfold``
+with and without a pool.
+
+    PYTHONPATH=. python benchmarks/shared_corpus.py [ndocs] [n_folds] [nprocs]
+"""
+import sys
+import pickle
+import tempfile
+import shutil
+from time import time
+from multiprocessing import Pool
+import numpy as np
+from sklearn.model_selection import StratifiedKFold
+from _corpus import documents
+from b4msa.textmodel import TextModel
+from b4msa.corpus import SharedCorpus
+from b4msa.classifier import SVC
+
+
+def main(ndocs=50000, n_folds=10, nprocs=4):
+    D = documents(ndocs)
+    X = [x['text'] for x in D]
+    y = np.array([x['klass'] for x in D])
+    kfolds = list(StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=0).split(X, y))
+    params = dict()
+    tokens = TextModel(**params).tokenize_corpus(X)
+    tr, ts = kfolds[0]
+    task = len(pickle.dumps((tokens, TextModel.corpus_counts(tokens), X, y, tr, ts, params)))
+    print("{0:>14} {1:10.1f} KB/fold".format('corpus', task / 1024))
+    path = tempfile.mkdtemp()
+    try:
+        shared = SharedCorpus(tokens).save(path)
+        task = len(pickle.dumps((shared, tr, y[tr], ts, params)))
+    finally:
+        shutil.rmtree(path)
+    print("{0:>14} {1:10.1f} KB/fold".format('SharedCorpus', task / 1024))
+    st = time()
+    hy = SVC.predict_kfold(X, y, kfolds=kfolds, textModel_params=params, use_tqdm=False)
+    print("{0:>14} {1:10.2f} s".format('no pool', time() - st))
+    with Pool(nprocs) as pool:
+        st = time()
+        _hy = SVC.predict_kfold(X, y, kfolds=kfolds, textModel_params=params,
+                                pool=pool, use_tqdm=False)
+        print("{0:>14} {1:10.2f} s".format('pool(%d)' % nprocs, time() - st))
+    assert np.all(hy == _hy)
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
@@ -0,0 +1,45 @@
+# Copyright 2016 Mario Graff (https://github.com/mgraffg)
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Throughput of :py:func:`b4msa.lang_dependency.LangDependency.stemming`
+and hit rate of the stemming memo.
+
+    PYTHONPATH=. python benchmarks/stemming.py [ndocs]
+"""
+import sys
+from time import time
+from _corpus import transformed
+from b4msa.lang_dependency import LangDependency
+
+
+def main(ndocs=20000):
+    X = transformed(ndocs)
+    ndocs = len(X)
+    lang = LangDependency('spanish')
+    stem = lang.stemmer.stem
+    st = time()
+    for x in X:
+        "~".join([stem(tok) for tok in x.strip().split('~')])
+    t = time() - st
+    print("{0:>12} {1:10.0f} docs/s".format('no memo', ndocs / t))
+    lang.stem_cache.clear()
+    st = time()
+    for x in X:
+        lang.stemming(x)
+    t = time() - st
+    print("{0:>12} {1:10.0f} docs/s hit rate={2:.3f}".format('memo', ndocs / t,
+                                                             lang.stem_cache.hit_rate))
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
@@ -0,0 +1,44 @@
+# Copyright 2016 Mario Graff (https://github.com/mgraffg)
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Throughput of :py:func:`b4msa.lang_dependency.LangDependency.filterStopWords`
+with `stopwords='delete'` and `stopwords='group'`, and the cost of creating
+a new :py:class:`b4msa.lang_dependency.LangDependency` per document.
+
+    PYTHONPATH=. python benchmarks/stopwords.py [ndocs]
+"""
+import sys
+from time import time
+from _corpus import transformed
+from b4msa.lang_dependency import LangDependency
+
+
+def main(ndocs=100000):
+    X = transformed(ndocs)
+    ndocs = len(X)
+    lang = LangDependency('spanish')
+    for option in ['delete', 'group']:
+        st = time()
+        for x in X:
+            lang.filterStopWords(x, option)
+        t = time() - st
+        print("{0:>6} {1:10.0f} docs/s".format(option, ndocs / t))
+    st = time()
+    for x in X[:ndocs // 10]:
+        LangDependency('spanish').filterStopWords(x, 'delete')
+    t = time() - st
+    print("{0:>6} {1:10.0f} docs/s (new instance per document)".format('delete', ndocs / 10 / t))
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
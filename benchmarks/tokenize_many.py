@@ -0,0 +1,53 @@
+# Copyright 2016 Mario Graff (https://github.com/mgraffg)
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Time and number of calls to the stemmer of
+:py:func:`b4msa.textmodel.TextModel.tokenize` (one document at a time)
+and :py:func:`b4msa.textmodel.TextModel.tokenize_many` (the whole batch)
+with `stemming=True`; the stemming memo is emptied before each run.
+
+    PYTHONPATH=. python benchmarks/tokenize_many.py [ndocs]
+"""
+import sys
+from time import time
+from _corpus import texts
+from b4msa.textmodel import TextModel
+
+
+def main(ndocs=20000):
+    X = texts(ndocs)
+    ndocs = len(X)
+    tm = TextModel(lang='spanish', stemming=True, stopwords='delete')
+    stemmer = tm.lang.stemmer
+    stem = stemmer.stem
+    calls = 0
+
+    def counter(tok):
+        nonlocal calls
+        calls += 1
+        return stem(tok)
+
+    stemmer.stem = counter
+    for name, func in [('tokenize', lambda: [tm.tokenize(x) for x in X]),
+                       ('tokenize_many', lambda: tm.tokenize_many(X))]:
+        tm.lang.stem_cache.clear()
+        calls = 0
+        st = time()
+        func()
+        t = time() - st
+        print("{0:>14} {1:10.0f} docs/s stemmer calls={2} memo lookups={3}".format(
+            name, ndocs / t, calls, tm.lang.stem_cache.hits + tm.lang.stem_cache.misses))
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
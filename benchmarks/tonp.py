@@ -0,0 +1,59 @@
+# Copyright 2016 Mario Graff (https://github.com/mgraffg)
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Time and memory of :py:func:`b4msa.classifier.SVC.tonp` on a list of
+vectors, and time of fit and predict, with `dtype` np.float64 and np.float32.
+
+    PYTHONPATH=. python benchmarks/tonp.py [nrows]
+"""
+import os
+import sys
+from time import time
+import numpy as np
+from microtc.utils import tweet_iterator
+from b4msa.textmodel import TextModel
+from b4msa.classifier import SVC
+
+
+def corpus(ndocs):
+    fname = os.path.join(os.path.dirname(__file__), '..', 'b4msa', 'tests', 'text.json')
+    tw = list(tweet_iterator(fname))
+    return [dict(text=tw[i % len(tw)]['text'] + ' %d' % i, klass=tw[i % len(tw)]['klass'])
+            for i in range(ndocs)]
+
+
+def main(nrows=1000000):
+    D = corpus(1000)
+    tm = TextModel(D)
+    V = [tm[x] for x in D]
+    y = [x['klass'] for x in D]
+    X = [V[i % len(V)] for i in range(nrows)]
+    Y = [y[i % len(y)] for i in range(nrows // 10)]
+    for dtype in [np.float64, np.float32]:
+        svc = SVC(tm, dtype=dtype, random_state=0)
+        svc._num_terms = tm.num_terms
+        st = time()
+        M = svc.tonp(X)
+        t = time() - st
+        nbytes = M.data.nbytes + M.indices.nbytes + M.indptr.nbytes
+        print("{0:>8} tonp {1:6.2f} s {2:8.1f} MB".format(dtype.__name__, t, nbytes / 2**20))
+        st = time()
+        svc.fit(X[:len(Y)], Y)
+        print("{0:>8} fit  {1:6.2f} s ({2} rows)".format(dtype.__name__, time() - st, len(Y)))
+        st = time()
+        svc.predict(M)
+        print("{0:>8} predict {1:6.2f} s".format(dtype.__name__, time() - st))
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
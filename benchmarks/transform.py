@@ -0,0 +1,42 @@
+# Copyright 2016 Mario Graff (https://github.com/mgraffg)
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Throughput of :py:func:`b4msa.textmodel.TextModel.transform` as a
+function of the number of processes.
+
+    PYTHONPATH=. python benchmarks/transform.py [ndocs]
+"""
+import sys
+from time import time
+from multiprocessing import cpu_count
+from _corpus import texts
+from b4msa.textmodel import TextModel
+
+
+def main(ndocs=100000):
+    X = texts(ndocs)
+    ndocs = len(X)
+    tm = TextModel(X[:1000], lang='spanish')
+    base = None
+    n_jobs = 1
+    while n_jobs <= cpu_count():
+        st = time()
+        tm.transform(X, n_jobs=n_jobs)
+        t = time() - st
+        base = t if base is None else base
+        print("n_jobs={0:>3} {1:10.0f} docs/s speedup={2:.2f}".format(n_jobs, ndocs / t, base / t))
+        n_jobs *= 2
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
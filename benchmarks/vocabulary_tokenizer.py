@@ -0,0 +1,52 @@
+# Copyright 2016 Mario Graff (https://github.com/mgraffg)
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Latency of :py:func:`b4msa.textmodel.TextModel.__getitem__` and of
+:py:func:`b4msa.textmodel.TextModel.token_ids` with and without
+:py:attr:`b4msa.textmodel.TextModel.vocabulary_tokenizer`. The model is
+trained on the first `ntrain` documents and measured on the following
+`ndocs`; the fewer training documents, the more tokens out of the
+vocabulary (oov is their fraction).
+
+    PYTHONPATH=. python benchmarks/vocabulary_tokenizer.py [ndocs] [ntrain]
+"""
+import sys
+from time import time
+from _corpus import texts
+from b4msa.textmodel import TextModel
+
+
+def latency(func, X):
+    st = time()
+    for x in X:
+        func(x)
+    return 1e6 * (time() - st) / len(X)
+
+
+def main(ndocs=10000, ntrain=1000):
+    X = texts(ntrain + ndocs)
+    train, X = X[:ntrain], X[ntrain:]
+    for kw in [dict(), dict(lang='spanish')]:
+        tm = TextModel(train, **kw)
+        w2id = tm.model.word2id
+        tokens = [t for x in X for t in tm.tokenize(x)]
+        oov = sum(t not in w2id for t in tokens) / len(tokens)
+        for flag in [False, True]:
+            tm.vocabulary_tokenizer = flag
+            for name, func in [('__getitem__', tm.__getitem__), ('token_ids', tm.token_ids)]:
+                print("{0!s:>20} oov={1:.2f} vocabulary_tokenizer={2!s:>5} {3:>12} {4:8.1f} us/text".format(
+                    kw, oov, flag, name, latency(func, X)))
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])